@@ -2,32 +2,164 @@
 Database connection and session management
 """
 
+import threading
+import time
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .settings import settings
 
-# Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before using them
-    echo=True,  # Log SQL queries for debugging
-)
+# Async drivers used in place of the sync driver named in DATABASE_URL
+ASYNC_DRIVERS = {
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql": "mysql+aiomysql",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# SQL_ECHO setting -> SQLAlchemy echo argument
+ECHO_MODES = {
+    "off": False,
+    "on": True,
+    "debug": "debug",
+}
+
+
+def get_async_database_url() -> str:
+    """
+    Resolve the URL for the async engine.
+    Uses ASYNC_DATABASE_URL when set, otherwise swaps the driver in DATABASE_URL
+    (pymysql -> aiomysql, sqlite -> aiosqlite).
+    """
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+
+    scheme, sep, rest = settings.DATABASE_URL.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+def get_engine_options(url: str) -> dict:
+    """
+    Build engine keyword arguments from settings.
+    SQLite stand-ins keep SQLAlchemy's default pool for that dialect.
+    """
+    options = {
+        "pool_pre_ping": True,  # Verify connections before using them
+        "echo": ECHO_MODES.get(settings.SQL_ECHO.lower(), False),
+    }
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+class PoolWaitStats:
+    """
+    Accumulates how long requests wait to check a connection out of the pool
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+pool_wait_stats = PoolWaitStats()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that times every checkout into pool_wait_stats"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except Exception:
+            pool_wait_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_wait_stats.record(time.perf_counter() - started)
+        return entry
+
+
+# Create database engine (used by init_db.py and other sync scripts)
+engine = create_engine(settings.DATABASE_URL, **get_engine_options(settings.DATABASE_URL))
 
 # Create SessionLocal class for database sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create async engine used by the API routes so queries never block the event loop
+_async_url = get_async_database_url()
+_async_options = get_engine_options(_async_url)
+if "pool_size" in _async_options:
+    _async_options["poolclass"] = InstrumentedAsyncQueuePool
+async_engine = create_async_engine(_async_url, **_async_options)
+
+# expire_on_commit=False keeps attributes loaded after commit; async sessions
+# cannot lazy-load them again while the response is being serialized
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # Create Base class for declarative models
 Base = declarative_base()
 
 
-def get_db():
+def get_pool_status() -> dict:
+    """
+    Report live connection pool usage of the API (async) engine for this worker
+    """
+    pool = async_engine.pool
+    status = {"pool_class": type(pool).__name__}
+
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            pool_size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            timeout_seconds=pool.timeout(),
+        )
+
+    status["wait"] = pool_wait_stats.snapshot()
+    return status
+
+
+async def get_db():
     """
-    Dependency function to get database session.
+    Dependency function to get an async database session.
     Used in FastAPI endpoints with Depends(get_db)
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -9,7 +9,15 @@ from config.settings import settings
 from models.user import User, UserRole
 from models.patient import Patient
 from models.drug import Drug
+from models.refresh_token import RefreshToken
+from models.cache_version import CacheVersion
+from models.patient_name_key import PatientNameKey
 from utils.security import get_password_hash
+from utils.fulltext import ensure_fulltext_indexes
+from utils.names import backfill_name_keys
+from utils.phones import backfill_phone_columns
+from utils.vitals import backfill_vital_columns
+from utils.migrations import add_missing_columns, convert_expiry_dates
 
 
 def init_database():
@@ -23,7 +31,7 @@ def init_database():
     # Create engine
     engine = create_engine(settings.DATABASE_URL, echo=True)
     
-    print("\n[1/2] Creating database tables...")
+    print("\n[1/3] Creating database tables...")
     try:
         # Create all tables
         Base.metadata.create_all(bind=engine)
@@ -32,7 +40,30 @@ def init_database():
         print(f"✗ Error creating tables: {e}")
         return False
     
-    print("\n[2/2] Database initialization complete!")
+    print("\n[2/3] Applying schema updates and creating search indexes...")
+    try:
+        with engine.begin() as conn:
+            expiry_converted, expiry_unparsed = convert_expiry_dates(conn)
+            for table in Base.metadata.sorted_tables:
+                added = add_missing_columns(conn, table)
+                if added:
+                    print(f"✓ Added columns to {table.name}: {', '.join(added)}")
+            created = ensure_fulltext_indexes(conn)
+            backfilled = backfill_name_keys(conn)
+            phones = backfill_phone_columns(conn)
+            vitals = backfill_vital_columns(conn)
+        print(f"✓ Full-text indexes ready ({', '.join(created) or 'already present'})")
+        print(f"✓ Phonetic name keys backfilled for {backfilled} patient(s)")
+        print(f"✓ Normalized phone numbers backfilled for {phones} patient(s)")
+        print(f"✓ Numeric vitals backfilled for {vitals} patient(s)")
+        print(f"✓ Drug expiry dates converted for {expiry_converted} drug(s)")
+        if expiry_unparsed:
+            print(f"! Cleared unrecognized expiry dates: {', '.join(expiry_unparsed)}")
+    except Exception as e:
+        print(f"✗ Error applying schema updates: {e}")
+        return False
+    
+    print("\n[3/3] Database initialization complete!")
     print("=" * 60)
     
     return True
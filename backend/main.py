@@ -3,10 +3,17 @@ St. Blaise Medical Clinic and Pharmacy - Backend API
 Main application file that initializes FastAPI and registers all routes
 """
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from config.database import async_engine, get_pool_status
 from config.settings import settings
-from routes import auth_router, patients_router, drugs_router, search_router
+from models.user import User, UserRole
+from routes import auth_router, patients_router, drugs_router, search_router, analytics_router
+from utils.instrumentation import install_query_hooks, sql_timing_middleware
+from utils.formulary import formulary_cache
+from utils.metrics import MetricsMiddleware, render_metrics
+from utils.security import password_queue_depth, require_role
 
 # Create FastAPI application instance
 app = FastAPI(
@@ -60,13 +67,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Next-Cursor", "X-Total-Count", "ETag"],
 )
 
+# Per-request SQL statement counts and DB time (Server-Timing header + slow-query log)
+install_query_hooks(async_engine.sync_engine)
+app.middleware("http")(sql_timing_middleware)
+
+# Request counts, latency histograms and in-flight gauge for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Register routers
 app.include_router(auth_router)
 app.include_router(patients_router)
 app.include_router(drugs_router)
 app.include_router(search_router)
+app.include_router(analytics_router)
 
 
 @app.get("/", tags=["Root"])
@@ -95,6 +111,47 @@ async def health_check():
     }
 
 
+@app.get("/health/pool", tags=["Root"])
+async def pool_status(
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """
+    Database connection pool statistics for this worker process (Admin only)
+    
+    Reports checked-out, idle and overflow connections plus checkout wait
+    times. Multiply pool_size + max_overflow by the uvicorn worker count to
+    get the worst-case number of MySQL connections.
+    """
+    return {
+        "service": settings.APP_NAME,
+        "pool": get_pool_status()
+    }
+
+
+@app.get("/metrics", tags=["Root"], response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus scrape endpoint for this worker process
+    
+    Exposes request counts and latency histograms per router (auth, patients,
+    drugs, search), in-flight requests, DB pool gauges, the bcrypt
+    verification queue depth and formulary cache size.
+    """
+    pool = get_pool_status()
+    gauges = {
+        "db_pool_checked_out": ("Connections currently checked out", pool.get("checked_out", 0)),
+        "db_pool_idle": ("Idle connections in the pool", pool.get("idle", 0)),
+        "db_pool_overflow": ("Overflow connections open beyond pool_size", pool.get("overflow", 0)),
+        "db_pool_checkout_wait_max_ms": ("Longest pool checkout wait", pool["wait"]["max_wait_ms"]),
+        "db_pool_checkout_timeouts": ("Pool checkouts that timed out", pool["wait"]["timeouts"]),
+        "password_hash_queue_depth": ("Password verifications running or queued", password_queue_depth()),
+        "formulary_cache_drugs": ("Drugs held in the in-memory formulary cache", formulary_cache.stats()["drugs"]),
+        "formulary_cache_reloads": ("Full reloads of the formulary cache", formulary_cache.reloads),
+        "formulary_cache_row_refreshes": ("Drugs re-read after stock changes in other workers", formulary_cache.row_refreshes),
+    }
+    return PlainTextResponse(render_metrics(gauges), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
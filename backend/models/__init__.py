@@ -3,5 +3,8 @@
 from .user import User, UserRole
 from .patient import Patient
 from .drug import Drug
+from .refresh_token import RefreshToken
+from .cache_version import CacheVersion
+from .patient_name_key import PatientNameKey
 
-__all__ = ["User", "UserRole", "Patient", "Drug"]
+__all__ = ["User", "UserRole", "Patient", "Drug", "RefreshToken", "CacheVersion", "PatientNameKey"]
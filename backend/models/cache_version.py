@@ -0,0 +1,21 @@
+"""
+Cache version model used to detect stale in-process caches across workers
+"""
+
+from sqlalchemy import Column, Integer, String
+from config.database import Base
+
+
+class CacheVersion(Base):
+    """
+    Cache version table
+    One row per cached dataset (e.g. "formulary"); writers increment the
+    version in the same transaction as the data change
+    """
+    __tablename__ = "cache_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CacheVersion(name='{self.name}', version={self.version})>"
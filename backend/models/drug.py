@@ -2,7 +2,7 @@
 Drug model for storing drug/formulary information
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, Index
 from sqlalchemy.sql import func
 from config.database import Base
 
@@ -30,7 +30,7 @@ class Drug(Base):
     # Additional drug information
     manufacturer = Column(String(100), nullable=True)
     batch_number = Column(String(50), nullable=True)
-    expiry_date = Column(String(20), nullable=True)  # Store as string for flexibility
+    expiry_date = Column(Date, nullable=True)
     quantity_in_stock = Column(Integer, nullable=False, default=0)
     unit_price = Column(Float, nullable=False)
     description = Column(Text, nullable=True)
@@ -42,9 +42,20 @@ class Drug(Base):
     # Status
     is_active = Column(Integer, default=1, nullable=False)  # 1 = active, 0 = archived
     
+    # Row version, bumped on every update (ETags, optimistic concurrency)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
+    __table_args__ = (
+        # Expiring-stock range scans: WHERE is_active = 1 AND expiry_date BETWEEN ...
+        Index("ix_drugs_active_expiry", "is_active", "expiry_date"),
+    )
+
+    # ORM updates add "WHERE version = <loaded version>" and raise StaleDataError on a lost race
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return f"<Drug(id={self.id}, drug_id='{self.drug_id}', brand_name='{self.brand_name}')>"
@@ -2,7 +2,7 @@
 Patient model for storing patient records
 """
 
-from sqlalchemy import Column, Integer, String, Date, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text
 from sqlalchemy.sql import func
 from config.database import Base
 
@@ -23,21 +23,29 @@ class Patient(Base):
     gender = Column(String(10), nullable=False)  # Male, Female, Other
     date_of_birth = Column(Date, nullable=False)
     phone_number = Column(String(20), nullable=True)
+    phone_e164 = Column(String(16), nullable=True, index=True)  # normalized on write, e.g. +639171234567
+    phone_reversed = Column(String(16), nullable=True, index=True)  # E.164 digits reversed, for suffix lookups
     address = Column(Text, nullable=True)
     
     # Emergency Contact
     emergency_contact = Column(String(100), nullable=True)
     relationship = Column(String(50), nullable=True)
     emergency_phone = Column(String(20), nullable=True)
+    emergency_phone_e164 = Column(String(16), nullable=True, index=True)
     
     # Physical Details
     height_cm = Column(Integer, nullable=True)
     weight_kg = Column(String(10), nullable=True)  # Decimal as string for flexibility
+    weight_kg_num = Column(Float, nullable=True)  # parsed from weight_kg on write
     
     # Screening Details
     blood_pressure = Column(String(20), nullable=True)
     temperature = Column(String(10), nullable=True)  # e.g., "37.2°C"
     heart_rate = Column(Integer, nullable=True)  # BPM as integer
+    # Parsed from blood_pressure and temperature on write, for analytics
+    systolic = Column(Integer, nullable=True)
+    diastolic = Column(Integer, nullable=True)
+    temp_c = Column(Float, nullable=True)
     
     # Medical Information
     allergies = Column(Text, nullable=True)
@@ -45,9 +53,15 @@ class Patient(Base):
     diagnosis = Column(Text, nullable=True)
     medical_history = Column(Text, nullable=True)
     
+    # Row version, bumped on every update (ETags, optimistic concurrency)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
+    # ORM updates add "WHERE version = <loaded version>" and raise StaleDataError on a lost race
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return f"<Patient(id={self.id}, name='{self.full_name}', age={self.age})>"
@@ -0,0 +1,21 @@
+"""
+Patient name key model for phonetic (fuzzy) name lookups
+"""
+
+from sqlalchemy import Column, Integer, String, ForeignKey
+from config.database import Base
+
+
+class PatientNameKey(Base):
+    """
+    Phonetic keys of patient names, one row per word of Patient.full_name
+    (e.g. "Maria Santos" -> M600, S532). Maintained on every patient write;
+    the primary key doubles as the lookup index on name_key.
+    """
+    __tablename__ = "patient_name_keys"
+
+    name_key = Column(String(16), primary_key=True)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+    def __repr__(self):
+        return f"<PatientNameKey(name_key='{self.name_key}', patient_id={self.patient_id})>"
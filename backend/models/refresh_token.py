@@ -0,0 +1,26 @@
+"""
+Refresh token model for re-authentication without a password check
+"""
+
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from config.database import Base
+
+
+class RefreshToken(Base):
+    """
+    Refresh token table
+    Stores only an HMAC digest of each issued token; tokens are single-use and
+    rotated on every /auth/refresh call
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)  # HMAC-SHA256 hex digest
+    expires_at = Column(DateTime, nullable=False)  # UTC
+    revoked = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<RefreshToken(id={self.id}, user_id={self.user_id}, revoked={self.revoked})>"
@@ -0,0 +1,144 @@
+"""
+Analytics routes
+Cohort statistics over patient vitals, computed with NumPy
+"""
+
+from typing import Literal, Optional
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.database import get_db
+from models.patient import Patient
+from models.user import User, UserRole
+from utils.security import require_role
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["Analytics"]
+)
+
+# Output name -> numeric column loaded into an array
+VITAL_COLUMNS = {
+    "age": Patient.age,
+    "height_cm": Patient.height_cm,
+    "weight_kg": Patient.weight_kg_num,
+    "systolic": Patient.systolic,
+    "diastolic": Patient.diastolic,
+    "temp_c": Patient.temp_c,
+    "heart_rate": Patient.heart_rate,
+}
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# WHO adult BMI classes: (upper bound, label)
+BMI_CLASSES = ((18.5, "underweight"), (25.0, "normal"), (30.0, "overweight"), (np.inf, "obese"))
+
+STREAM_BATCH_SIZE = 10000
+
+
+async def load_vitals(db: AsyncSession, statement) -> dict:
+    """
+    Stream a select of VITAL_COLUMNS into one float array per column (NaN where NULL),
+    converting a batch of rows at a time
+    """
+    chunks = []
+    result = await db.stream(statement.execution_options(yield_per=STREAM_BATCH_SIZE))
+    async for partition in result.partitions():
+        block = np.array(partition, dtype=object)
+        block[block == None] = np.nan  # noqa: E711 - elementwise NULL check
+        chunks.append(block.astype(float))
+
+    matrix = np.concatenate(chunks) if chunks else np.empty((0, len(VITAL_COLUMNS)))
+    return {name: matrix[:, index] for index, name in enumerate(VITAL_COLUMNS)}
+
+
+def describe(values: np.ndarray, bins: int) -> dict:
+    """Count, mean, spread, percentiles and histogram of the non-NaN values"""
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return {"count": 0}
+
+    counts, edges = np.histogram(values, bins=bins)
+    return {
+        "count": int(values.size),
+        "mean": round(float(values.mean()), 2),
+        "std": round(float(values.std()), 2),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+        "histogram": {"counts": counts.tolist(), "edges": [round(float(edge), 2) for edge in edges]},
+    }
+
+
+@router.get(
+    "/vitals",
+    summary="Vitals Cohort Statistics"
+)
+async def vitals_statistics(
+    min_age: Optional[int] = Query(None, ge=0, le=150),
+    max_age: Optional[int] = Query(None, ge=0, le=150),
+    gender: Optional[Literal["Male", "Female", "Other"]] = None,
+    bins: int = Query(10, ge=1, le=100, description="Histogram bins per measure"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.DOCTOR]))
+):
+    """
+    Distribution of vitals across a patient cohort filtered by age and gender.
+
+    Reads the numeric vitals columns (parsed from the screening form text on
+    every write) column-wise into NumPy arrays; no text is parsed per request.
+
+    **Query Parameters:**
+    - min_age / max_age: Inclusive age range
+    - gender: Male, Female or Other
+    - bins: Histogram bins per measure (default: 10)
+
+    **Returns:**
+    - patients: Cohort size
+    - vitals: Per measure (age, height_cm, weight_kg, systolic, diastolic,
+      temp_c, heart_rate) count, mean, std, min, max, p5/p25/p50/p75/p95 and
+      histogram; measures a patient lacks are skipped for that patient
+    - bmi: Same statistics for BMI where height and weight are both known,
+      plus counts per WHO class
+
+    **Authorization:**
+    - Requires authentication
+    - Allowed roles: Admin, Doctor
+
+    **Errors:**
+    - 422 Unprocessable Entity: min_age greater than max_age
+    """
+    if min_age is not None and max_age is not None and min_age > max_age:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="min_age cannot be greater than max_age"
+        )
+
+    statement = select(*VITAL_COLUMNS.values())
+    if min_age is not None:
+        statement = statement.where(Patient.age >= min_age)
+    if max_age is not None:
+        statement = statement.where(Patient.age <= max_age)
+    if gender:
+        statement = statement.where(Patient.gender == gender)
+
+    vitals = await load_vitals(db, statement)
+
+    height_m = vitals["height_cm"] / 100
+    bmi = vitals["weight_kg"] / (height_m * height_m)
+    known_bmi = bmi[~np.isnan(bmi)]
+    class_index = np.searchsorted([bound for bound, _ in BMI_CLASSES], known_bmi, side="right")
+    class_counts = np.bincount(class_index, minlength=len(BMI_CLASSES))
+
+    return {
+        "patients": int(vitals["age"].size),
+        "filters": {"min_age": min_age, "max_age": max_age, "gender": gender},
+        "vitals": {name: describe(values, bins) for name, values in vitals.items()},
+        "bmi": {
+            **describe(bmi, bins),
+            "classes": {label: int(count) for (_, label), count in zip(BMI_CLASSES, class_counts)},
+        },
+    }
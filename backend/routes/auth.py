@@ -6,14 +6,25 @@ Handles login and token generation (Supporting Form: Login)
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from datetime import timedelta
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta
+from typing import Optional
 
 from config.database import get_db
 from config.settings import settings
-from models.user import User
-from utils.schemas import Token
-from utils.security import verify_password, create_access_token
+from models.refresh_token import RefreshToken
+from models.user import User, UserRole
+from utils.schemas import Token, RefreshRequest
+from utils.security import (
+    verify_password_async,
+    create_access_token,
+    create_refresh_token,
+    hash_refresh_token,
+    principal_cache,
+    get_current_active_user,
+    require_role,
+)
 
 router = APIRouter(
     prefix="/auth",
@@ -21,10 +32,63 @@ router = APIRouter(
 )
 
 
+async def issue_tokens(user: User, db: AsyncSession) -> dict:
+    """
+    Create an access token and a new stored refresh token for a user,
+    committing the refresh token record
+    """
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.username, "role": user.role.value},
+        expires_delta=access_token_expires
+    )
+    
+    refresh_token = create_refresh_token()
+    db.add(RefreshToken(
+        user_id=user.id,
+        token_hash=hash_refresh_token(refresh_token),
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    await db.commit()
+    
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token
+    }
+
+
+async def load_login_user(username: str, db: AsyncSession) -> Optional[User]:
+    """
+    Look up the user for a password login and end the read transaction, so
+    the pooled connection goes back before the slow bcrypt check
+    (expire_on_commit=False keeps the loaded attributes usable)
+    """
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalars().first()
+    await db.commit()
+    return user
+
+
+async def revoke_refresh_tokens(user_id: int, db: AsyncSession) -> int:
+    """
+    Revoke every outstanding refresh token of a user (caller commits)
+    
+    Returns:
+        int: Number of tokens revoked
+    """
+    result = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked == False)  # noqa: E712
+        .values(revoked=True)
+    )
+    return result.rowcount
+
+
 @router.post("/token", response_model=Token, summary="Login Form Endpoint")
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     **SUPPORTING FORM 1: LOGIN FORM**
@@ -43,7 +107,7 @@ async def login_for_access_token(
     **Process:**
     1. Receive username and password from login form
     2. Query database for user with matching username
-    3. Verify password against stored hash
+    3. Verify password against stored hash (on the bcrypt worker pool)
     4. Check if account is active
     5. Generate JWT token with user info
     6. Return token for subsequent authenticated requests
@@ -51,15 +115,19 @@ async def login_for_access_token(
     **Returns:**
     - access_token: JWT token for authentication
     - token_type: "bearer"
+    - refresh_token: Single-use token for POST /auth/refresh
     
     **Errors:**
     - 401 Unauthorized: Invalid credentials or inactive account
+    - 503 Service Unavailable: Password verification pool is saturated
     """
-    # Query user from database
-    user = db.query(User).filter(User.username == form_data.username).first()
+    # Query user from database (no connection is held during the hash)
+    user = await load_login_user(form_data.username, db)
+    hashed_password = user.hashed_password if user else None
+    is_active = user.is_active if user else False
     
     # Verify user exists and password is correct
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -67,25 +135,15 @@ async def login_for_access_token(
         )
     
     # Check if user account is active
-    if not user.is_active:
+    if not is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Account is inactive. Please contact administrator.",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Create access token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username, "role": user.role.value},
-        expires_delta=access_token_expires
-    )
-    
-    # Return token
-    return {
-        "access_token": access_token,
-        "token_type": "bearer"
-    }
+    # Create and return access + refresh tokens
+    return await issue_tokens(user, db)
 
 
 class LoginRequest(BaseModel):
@@ -96,7 +154,7 @@ class LoginRequest(BaseModel):
 @router.post("/login", response_model=Token, summary="Alternative Login Endpoint (JSON)")
 async def login_json(
     payload: LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Alternative login endpoint that accepts JSON body.
     **Example Request Body:**
@@ -107,7 +165,7 @@ async def login_json(
     """
     try:
         print(f"Login attempt for username: {payload.username}")
-        user = db.query(User).filter(User.username == payload.username).first()
+        user = await load_login_user(payload.username, db)
         
         if not user:
             print(f"User not found: {payload.username}")
@@ -116,31 +174,141 @@ async def login_json(
                 detail="Incorrect username or password"
             )
             
-        print(f"User found: {user.username}, active: {user.is_active}")
+        hashed_password, is_active = user.hashed_password, user.is_active
+        print(f"User found: {user.username}, active: {is_active}")
         
-        if not verify_password(payload.password, user.hashed_password):
+        if not await verify_password_async(payload.password, hashed_password):
             print("Password verification failed")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password"
             )
             
-        if not user.is_active:
+        if not is_active:
             print("User account is inactive")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Account is inactive"
             )
             
-        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": user.username, "role": user.role.value},
-            expires_delta=access_token_expires
-        )
+        tokens = await issue_tokens(user, db)
         
         print(f"Login successful for {user.username}")
-        return {"access_token": access_token, "token_type": "bearer"}
+        return tokens
         
     except Exception as e:
         print(f"Login error: {e}")
         raise
+
+
+@router.post("/refresh", response_model=Token, summary="Refresh Access Token")
+async def refresh_access_token(
+    payload: RefreshRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Exchange a refresh token for a new access token and refresh token.
+    
+    Costs one indexed lookup plus an HMAC instead of a bcrypt password check.
+    Refresh tokens are single-use: the presented token is revoked and a new one
+    is returned. Presenting an already-used token revokes all of the user's
+    refresh tokens, since it means the token was copied.
+    
+    **Errors:**
+    - 401 Unauthorized: Unknown, expired or revoked token, or inactive account
+    """
+    invalid_token_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    result = await db.execute(
+        select(RefreshToken).where(RefreshToken.token_hash == hash_refresh_token(payload.refresh_token))
+    )
+    record = result.scalars().first()
+    
+    if not record or record.expires_at <= datetime.utcnow():
+        raise invalid_token_exception
+    
+    if record.revoked:
+        await revoke_refresh_tokens(record.user_id, db)
+        await db.commit()
+        raise invalid_token_exception
+    
+    user = await db.get(User, record.user_id)
+    if not user or not user.is_active:
+        raise invalid_token_exception
+    
+    # Rotate atomically: of several concurrent refreshes with the same token,
+    # only the one whose UPDATE flips revoked gets a new pair
+    rotated = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == record.id, RefreshToken.revoked == False)  # noqa: E712
+        .values(revoked=True)
+    )
+    if rotated.rowcount != 1:
+        await revoke_refresh_tokens(record.user_id, db)
+        await db.commit()
+        raise invalid_token_exception
+
+    return await issue_tokens(user, db)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT, summary="Revoke Own Refresh Tokens")
+async def logout(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Revoke all refresh tokens of the current user on every device.
+    Access tokens already issued stay valid until they expire.
+    """
+    await revoke_refresh_tokens(current_user.id, db)
+    await db.commit()
+    return None
+
+
+@router.post(
+    "/users/{user_id}/revoke",
+    summary="Revoke a User's Refresh Tokens"
+)
+async def revoke_user_tokens(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """
+    Revoke all refresh tokens of a user, forcing a password login on next expiry.
+    
+    **Authorization:**
+    - Allowed roles: Admin only
+    
+    **Errors:**
+    - 404 Not Found: User does not exist
+    """
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with ID {user_id} not found"
+        )
+    
+    revoked = await revoke_refresh_tokens(user_id, db)
+    await db.commit()
+    return {"user_id": user_id, "revoked": revoked}
+
+
+@router.get("/principal-cache", summary="Authenticated-Principal Cache Statistics")
+async def principal_cache_stats(
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """
+    Report size and hit/miss counters of the principal cache used by
+    get_current_user. A high hit ratio means authenticated requests are
+    skipping the users table lookup.
+    
+    **Authorization:**
+    - Allowed roles: Admin only
+    """
+    return principal_cache.stats()
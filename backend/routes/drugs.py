@@ -3,14 +3,38 @@ Drug/Formulary management routes
 Handles drug inventory operations (Major Form: Add New Drug)
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from datetime import date, timedelta
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from pydantic import ValidationError
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, FrozenSet, List, Literal, Optional
 
 from config.database import get_db
+from config.settings import settings
 from models.drug import Drug
 from models.user import User, UserRole
-from utils.schemas import DrugCreate, DrugOut, DrugUpdate
+from utils.importers import format_validation_errors
+from utils.schemas import (
+    DrugBatchRequest,
+    DrugBatchResponse,
+    DrugCreate,
+    DrugOut,
+    DrugUpdate,
+    DrugUpsert,
+    DrugUpsertSummary,
+    FormularySummary,
+    StockAdjustment,
+    StockLevel,
+)
+from utils.etags import check_if_match, flush_versioned, list_etag, not_modified, record_etag
+from utils.exporters import export_response
+from utils.cache import bump_cache_version
+from utils.formulary import FORMULARY_CACHE_NAME, formulary_cache
+from utils.pagination import clamp_page_size, decode_cursor, set_next_cursor
 from utils.security import get_current_active_user, require_role
 
 router = APIRouter(
@@ -27,7 +51,7 @@ router = APIRouter(
 )
 async def create_drug(
     drug_data: DrugCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.PHARMACIST]))
 ):
     """
@@ -76,7 +100,8 @@ async def create_drug(
     - 422 Unprocessable Entity: Validation errors
     """
     # Check for duplicate drug_id
-    existing_drug = db.query(Drug).filter(Drug.drug_id == drug_data.drug_id).first()
+    result = await db.execute(select(Drug).where(Drug.drug_id == drug_data.drug_id))
+    existing_drug = result.scalars().first()
     if existing_drug:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -88,8 +113,11 @@ async def create_drug(
     
     # Add to database
     db.add(new_drug)
-    db.commit()
-    db.refresh(new_drug)
+    await db.flush()
+    new_version = await bump_cache_version(db, FORMULARY_CACHE_NAME)
+    await db.commit()
+    await db.refresh(new_drug)
+    formulary_cache.apply_write(new_drug.id, new_drug, new_version)
     
     # In production, log this activity to UserActivityLog
     # log_activity(current_user.id, "CREATE_DRUG", new_drug.id)
@@ -97,37 +125,354 @@ async def create_drug(
     return new_drug
 
 
+UPSERT_INSERTS = {"mysql": mysql_insert, "sqlite": sqlite_insert}
+
+# Model columns stored as 0/1 integers but sent as booleans
+FLAG_COLUMNS = ("prescription_required", "is_active")
+
+
+def drug_upsert_statement(dialect_name: str, update_columns: FrozenSet[str]):
+    """
+    INSERT of full drug rows that, on a drug_id conflict, overwrites only
+    update_columns (ON DUPLICATE KEY UPDATE on MySQL, ON CONFLICT on SQLite)
+    """
+    if dialect_name not in UPSERT_INSERTS:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f"Bulk upsert is not supported on {dialect_name}"
+        )
+    
+    statement = UPSERT_INSERTS[dialect_name](Drug)
+    if dialect_name == "mysql":
+        assignments = {column: statement.inserted[column] for column in update_columns}
+        return statement.on_duplicate_key_update(updated_at=func.now(), version=Drug.version + 1, **assignments)
+    
+    assignments = {column: statement.excluded[column] for column in update_columns}
+    return statement.on_conflict_do_update(
+        index_elements=[Drug.drug_id],
+        set_={"updated_at": func.now(), "version": Drug.version + 1, **assignments}
+    )
+
+
+@router.post(
+    "/upsert",
+    response_model=DrugUpsertSummary,
+    summary="Bulk Upsert Formulary (Supplier Price/Stock Files)"
+)
+async def upsert_drugs(
+    rows: List[DrugUpsert] = Body(..., description="Drug rows keyed on drug_id"),
+    dry_run: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.PHARMACIST]))
+):
+    """
+    Apply a supplier file of drug rows, keyed on Drug ID, in one transaction.
+    
+    **Body:**
+    - List of rows with drug_id plus any Update Drug fields; unset fields
+      keep their current value (e.g. only unit_price and quantity_in_stock)
+    - Rows for unknown drug IDs are inserted and need every Add New Drug field
+    - Later rows for the same drug ID override earlier ones
+    
+    **Process:**
+    1. Load current values of the listed drugs with IN queries of 500 codes
+    2. Diff each row against them and keep only changed columns
+    3. Write all inserted and changed rows with set-based upsert statements
+       (one per distinct set of changed columns), bumping the formulary version
+    
+    **Query Parameters:**
+    - dry_run: Report what would change without writing
+    
+    **Authorization:**
+    - Requires authentication
+    - Allowed roles: Admin, Pharmacist
+    
+    **Errors:**
+    - 413 Request Entity Too Large: More than MAX_UPSERT_ROWS rows
+    - 422 Unprocessable Entity: Invalid rows (by 0-based index); nothing is written
+    """
+    if len(rows) > settings.MAX_UPSERT_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.MAX_UPSERT_ROWS} rows per upsert"
+        )
+    
+    # Merge repeated drug IDs so each drug is diffed once
+    incoming: Dict[str, tuple] = {}
+    for index, row in enumerate(rows):
+        previous = incoming.get(row.drug_id, (index, {}))[1]
+        incoming[row.drug_id] = (index, {**previous, **row.model_dump(exclude_unset=True)})
+    
+    columns = [column.name for column in Drug.__table__.columns
+               if column.name not in ("id", "version", "created_at", "updated_at")]
+    current = {}
+    codes = list(incoming)
+    for start in range(0, len(codes), 500):
+        result = await db.execute(
+            select(*(Drug.__table__.c[column] for column in columns))
+            .where(Drug.drug_id.in_(codes[start:start + 500]))
+        )
+        current.update((row.drug_id, dict(row._mapping)) for row in result)
+    
+    errors = []
+    writes: Dict[FrozenSet[str], List[dict]] = {}
+    inserted, updated = [], []
+    unchanged = 0
+    for drug_code, (index, values) in incoming.items():
+        for column in FLAG_COLUMNS:
+            if values.get(column) is not None:
+                values[column] = int(values[column])
+        
+        existing = current.get(drug_code)
+        if existing is None:
+            try:
+                new_values = DrugCreate.model_validate(values).model_dump()
+            except ValidationError as e:
+                errors.append({"row": index, "errors": format_validation_errors(e.errors())})
+                continue
+            for column in FLAG_COLUMNS:
+                new_values[column] = int(new_values[column] if new_values[column] is not None else True)
+            writes.setdefault(frozenset(values) - {"drug_id"}, []).append(new_values)
+            inserted.append(drug_code)
+            continue
+        
+        nulled = [column for column, value in values.items()
+                  if value is None and not Drug.__table__.c[column].nullable]
+        if nulled:
+            errors.append({"row": index, "errors": [f"{column}: cannot be null" for column in nulled]})
+            continue
+        
+        changed = frozenset(column for column, value in values.items() if existing[column] != value)
+        if not changed:
+            unchanged += 1
+            continue
+        writes.setdefault(changed, []).append({**existing, **values})
+        updated.append(drug_code)
+    
+    if errors:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=errors)
+    
+    if writes and not dry_run:
+        dialect_name = db.get_bind().dialect.name
+        for changed, batch in writes.items():
+            await db.execute(drug_upsert_statement(dialect_name, changed), batch)
+        await bump_cache_version(db, FORMULARY_CACHE_NAME)
+        await db.commit()
+        # Too many rows for write-through; reload the snapshot on the next read
+        formulary_cache.mark_stale()
+    
+    return {"inserted": inserted, "updated": updated, "unchanged": unchanged, "dry_run": dry_run}
+
+
 @router.get(
     "",
     response_model=List[DrugOut],
     summary="Get All Drugs (Formulary)"
 )
 async def get_all_drugs(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, description="Page size (capped at MAX_PAGE_SIZE)"),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     active_only: bool = True,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Retrieve all drugs in the formulary with pagination.
+    Retrieve all drugs in the formulary with pagination, ordered by ID.
+    Served from the in-memory formulary cache.
     
     **Query Parameters:**
-    - skip: Number of records to skip (default: 0)
-    - limit: Maximum number of records to return (default: 100)
+    - cursor: Opaque cursor from the previous page's X-Next-Cursor header (keyset mode)
+    - skip: Number of records to skip (default: 0, offset mode; ignored with cursor)
+    - limit: Maximum number of records to return (default: 100, capped at MAX_PAGE_SIZE)
+    - include_total: Add an X-Total-Count header
     - active_only: Only return active drugs (default: True)
     
+    **Response Headers:**
+    - X-Next-Cursor: Cursor for the next page, present when more rows may follow
+    - X-Total-Count: Total matching drugs, when include_total is set
+    - ETag: Fingerprint of the page; send it back as If-None-Match to get
+      304 Not Modified while no drug on it changed
+    
     **Authorization:**
     - Requires authentication
     - All authenticated users can view formulary
     """
-    query = db.query(Drug)
+    limit = clamp_page_size(limit)
+    
+    if include_total:
+        response.headers["X-Total-Count"] = str(await formulary_cache.count(db, active_only))
+    
+    drugs = await formulary_cache.list(
+        db,
+        active_only=active_only,
+        limit=limit,
+        after_id=decode_cursor(cursor) if cursor else None,
+        skip=skip,
+    )
+    
+    etag = list_etag(drugs)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    response.headers["ETag"] = etag
+    set_next_cursor(response, drugs, limit)
+    return drugs
+
+
+@router.post(
+    "/batch",
+    response_model=DrugBatchResponse,
+    summary="Get Several Drugs by ID or Drug Code"
+)
+async def get_drugs_batch(
+    request: DrugBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Resolve a basket of drugs in one call, e.g. for the cashier and dispensing screens.
+    Served from the in-memory formulary cache, so no per-item queries.
     
-    if active_only:
-        query = query.filter(Drug.is_active == 1)
+    **Body (exactly one of):**
+    - ids: Database IDs
+    - codes: Drug codes (e.g. "DR-001"; case-insensitive)
     
-    drugs = query.offset(skip).limit(limit).all()
-    return drugs
+    At most MAX_BATCH_SIZE entries.
+    
+    **Returns:**
+    - results: One entry per requested ID or code, in request order (null where not found)
+    - missing: Requested IDs or codes that do not exist
+    
+    **Authorization:**
+    - Requires authentication
+    
+    **Errors:**
+    - 413 Request Entity Too Large: More than MAX_BATCH_SIZE entries
+    - 422 Unprocessable Entity: Neither or both of ids and codes given
+    """
+    if bool(request.ids) == bool(request.codes):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Provide either ids or codes"
+        )
+    
+    keys = request.ids or request.codes
+    if len(keys) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.MAX_BATCH_SIZE} entries per batch"
+        )
+    
+    lookup = formulary_cache.get if request.ids else formulary_cache.get_by_code
+    found = {key: await lookup(db, key) for key in dict.fromkeys(keys)}
+    return {
+        "results": [found[key] for key in keys],
+        "missing": [key for key, drug in found.items() if drug is None],
+    }
+
+
+@router.get(
+    "/summary",
+    response_model=FormularySummary,
+    summary="Formulary Stock Summary (Pharmacist Dashboard)"
+)
+async def get_formulary_summary(
+    low_stock_threshold: int = Query(settings.LOW_STOCK_THRESHOLD, ge=1, description="Reorder level in units"),
+    low_stock_limit: int = Query(50, ge=0, description="Most low-stock drugs to list (capped at MAX_PAGE_SIZE)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.PHARMACIST]))
+):
+    """
+    Inventory valuation and reorder list for active drugs.
+    
+    Totals are kept up to date incrementally by every drug write (create,
+    update, archive, stock adjustment) in the formulary cache, so this read
+    costs O(categories) rather than a pass over the formulary.
+    
+    **Returns:**
+    - categories: Per category, number of drugs, units in stock and stock
+      value (quantity x unit price), by category name
+    - drug_count / units_in_stock / stock_value: Totals over all categories
+    - low_stock: Drugs with fewer than low_stock_threshold units, fewest first
+      (low_stock_count gives the full number)
+    
+    **Authorization:**
+    - Requires authentication
+    - Allowed roles: Admin, Pharmacist
+    """
+    return await formulary_cache.summary(db, low_stock_threshold, clamp_page_size(low_stock_limit))
+
+
+@router.get(
+    "/expiring",
+    response_model=List[DrugOut],
+    summary="Get Drugs Expiring Soon"
+)
+async def get_expiring_drugs(
+    within_days: int = Query(60, ge=0, le=3650, description="Expiry window from today, in days"),
+    include_expired: bool = Query(False, description="Also list active drugs already past expiry"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, description="Page size (capped at MAX_PAGE_SIZE)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Active drugs expiring within the next within_days days, soonest first.
+    
+    Answered by a range scan on the (is_active, expiry_date) index.
+    Drugs without an expiry date are never listed.
+    
+    **Query Parameters:**
+    - within_days: Window from today (default: 60)
+    - include_expired: Also return active drugs whose expiry date has passed
+    - skip / limit: Offset pagination (limit capped at MAX_PAGE_SIZE)
+    
+    **Authorization:**
+    - Requires authentication
+    """
+    today = date.today()
+    query = select(Drug).where(Drug.is_active == 1, Drug.expiry_date <= today + timedelta(days=within_days))
+    if not include_expired:
+        query = query.where(Drug.expiry_date >= today)
+    
+    result = await db.execute(
+        query.order_by(Drug.expiry_date, Drug.id).offset(skip).limit(clamp_page_size(limit))
+    )
+    return result.scalars().all()
+
+
+@router.get(
+    "/export",
+    summary="Export Formulary (NDJSON / CSV)"
+)
+async def export_drugs(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    active_only: bool = False,
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.PHARMACIST]))
+):
+    """
+    Download the formulary, ordered by ID, as NDJSON or CSV.
+    
+    Read straight from the database through a server-side cursor (not the
+    formulary cache) and streamed row by row.
+    
+    **Query Parameters:**
+    - format: ndjson (default) or csv (with a header row)
+    - active_only: Only export active drugs (default: False, full dump)
+    
+    **Authorization:**
+    - Requires authentication
+    - Allowed roles: Admin, Pharmacist
+    """
+    columns = list(DrugOut.model_fields)
+    statement = select(*(Drug.__table__.c[column] for column in columns)).order_by(Drug.id)
+    if active_only:
+        statement = statement.where(Drug.is_active == 1)
+    return export_response(statement, columns, format, "drugs")
 
 
 @router.get(
@@ -137,7 +482,9 @@ async def get_all_drugs(
 )
 async def get_drug(
     drug_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -146,13 +493,17 @@ async def get_drug(
     **Path Parameters:**
     - drug_id: The unique database identifier of the drug
     
+    **Response Headers:**
+    - ETag: Version of the record; send it back as If-None-Match to get
+      304 Not Modified while it is unchanged, or as If-Match when updating
+    
     **Authorization:**
     - Requires authentication
     
     **Errors:**
     - 404 Not Found: Drug with specified ID does not exist
     """
-    drug = db.query(Drug).filter(Drug.id == drug_id).first()
+    drug = await formulary_cache.get(db, drug_id)
     
     if not drug:
         raise HTTPException(
@@ -160,6 +511,11 @@ async def get_drug(
             detail=f"Drug with ID {drug_id} not found"
         )
     
+    etag = record_etag(drug)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    response.headers["ETag"] = etag
     return drug
 
 
@@ -170,7 +526,9 @@ async def get_drug(
 )
 async def get_drug_by_code(
     drug_code: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -179,10 +537,13 @@ async def get_drug_by_code(
     **Path Parameters:**
     - drug_code: The drug identifier code (e.g., DR-001)
     
+    **Response Headers:**
+    - ETag: Same as GET /drugs/{id}; If-None-Match returns 304 while unchanged
+    
     **Errors:**
     - 404 Not Found: Drug with specified code does not exist
     """
-    drug = db.query(Drug).filter(Drug.drug_id == drug_code.upper()).first()
+    drug = await formulary_cache.get_by_code(db, drug_code.upper())
     
     if not drug:
         raise HTTPException(
@@ -190,6 +551,11 @@ async def get_drug_by_code(
             detail=f"Drug with code '{drug_code}' not found"
         )
     
+    etag = record_etag(drug)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    response.headers["ETag"] = etag
     return drug
 
 
@@ -201,12 +567,18 @@ async def get_drug_by_code(
 async def update_drug(
     drug_id: int,
     drug_data: DrugUpdate,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.PHARMACIST]))
 ):
     """
     Update an existing drug record.
     
+    **Request Headers:**
+    - If-Match: ETag from the last read; the update is rejected if the
+      record changed since (recommended for all edits)
+    
     **Authorization:**
     - Requires authentication
     - Allowed roles: Admin, Pharmacist
@@ -214,8 +586,9 @@ async def update_drug(
     **Errors:**
     - 404 Not Found: Drug does not exist
     - 403 Forbidden: User role not authorized
+    - 412 Precondition Failed: Record changed since the If-Match ETag was issued
     """
-    drug = db.query(Drug).filter(Drug.id == drug_id).first()
+    drug = await db.get(Drug, drug_id)
     
     if not drug:
         raise HTTPException(
@@ -223,13 +596,81 @@ async def update_drug(
             detail=f"Drug with ID {drug_id} not found"
         )
     
+    check_if_match(request, record_etag(drug))
+    
     # Update only provided fields
     update_data = drug_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(drug, field, value)
     
-    db.commit()
-    db.refresh(drug)
+    await flush_versioned(db)
+    new_version = await bump_cache_version(db, FORMULARY_CACHE_NAME)
+    await db.commit()
+    await db.refresh(drug)
+    formulary_cache.apply_write(drug.id, drug, new_version)
+    
+    response.headers["ETag"] = record_etag(drug)
+    return drug
+
+
+@router.post(
+    "/{drug_id}/stock",
+    response_model=StockLevel,
+    summary="Adjust Drug Stock"
+)
+async def adjust_stock(
+    drug_id: int,
+    adjustment: StockAdjustment,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.PHARMACIST, UserRole.ASSISTANT_CASHIER]))
+):
+    """
+    Add or remove stock atomically, e.g. when dispensing.
+    
+    Applies the delta with a single conditional UPDATE, so concurrent
+    adjustments never overwrite each other and stock never goes negative.
+    Use this instead of reading the drug and sending the new quantity via PUT.
+    
+    **Body:**
+    - delta: Signed change in units (non-zero)
+    - reason: Optional note
+    
+    **Returns:**
+    - The drug's new quantity in stock
+    
+    **Authorization:**
+    - Requires authentication
+    - Allowed roles: Admin, Pharmacist, Assistant/Cashier
+    
+    **Errors:**
+    - 404 Not Found: Drug does not exist
+    - 409 Conflict: Not enough stock to remove
+    """
+    new_quantity = Drug.quantity_in_stock + adjustment.delta
+    result = await db.execute(
+        update(Drug)
+        .where(Drug.id == drug_id, new_quantity >= 0)
+        .values(quantity_in_stock=new_quantity, version=Drug.version + 1)
+    )
+    
+    if result.rowcount == 0:
+        drug = await db.get(Drug, drug_id)
+        if not drug:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Drug with ID {drug_id} not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Only {drug.quantity_in_stock} units of '{drug.drug_id}' in stock"
+        )
+    
+    # Same transaction, so this reads our own write (the row stays locked on MySQL).
+    # No formulary version bump: that single row would serialize every
+    # dispense; other workers see the new row version on their next check.
+    drug = await db.get(Drug, drug_id, populate_existing=True)
+    await db.commit()
+    formulary_cache.apply_row_update(drug)
     
     return drug
 
@@ -242,7 +683,7 @@ async def update_drug(
 async def archive_drug(
     drug_id: int,
     permanent: bool = False,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN]))
 ):
     """
@@ -259,7 +700,7 @@ async def archive_drug(
     - 404 Not Found: Drug does not exist
     - 403 Forbidden: User is not Admin
     """
-    drug = db.query(Drug).filter(Drug.id == drug_id).first()
+    drug = await db.get(Drug, drug_id)
     
     if not drug:
         raise HTTPException(
@@ -269,11 +710,19 @@ async def archive_drug(
     
     if permanent:
         # Permanently delete from database
-        db.delete(drug)
+        await db.delete(drug)
     else:
         # Just mark as inactive (soft delete)
         drug.is_active = 0
     
-    db.commit()
+    await flush_versioned(db)
+    new_version = await bump_cache_version(db, FORMULARY_CACHE_NAME)
+    await db.commit()
+    
+    if permanent:
+        formulary_cache.apply_write(drug_id, None, new_version)
+    else:
+        await db.refresh(drug)
+        formulary_cache.apply_write(drug_id, drug, new_version)
     
     return None
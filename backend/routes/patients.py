@@ -3,14 +3,33 @@ Patient management routes
 Handles patient record operations (Major Form: Add New Patient)
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic import ValidationError
+from sqlalchemy import exists, insert, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 
 from config.database import get_db
+from config.settings import settings
 from models.patient import Patient
+from models.patient_name_key import PatientNameKey
 from models.user import User, UserRole
-from utils.schemas import PatientCreate, PatientOut
+from utils.schemas import (
+    ImportSummary,
+    PatientBatchRequest,
+    PatientBatchResponse,
+    PatientCreate,
+    PatientOut,
+    PatientUpdate,
+)
+from utils.etags import check_if_match, flush_versioned, list_etag, not_modified, record_etag
+from utils.exporters import export_response
+from utils.importers import format_validation_errors, iter_csv_records, iter_ndjson_records, iter_text_lines
+from utils.names import name_key_rows
+from utils.pagination import approximate_count, clamp_page_size, decode_cursor, set_next_cursor
+from utils.phones import apply_phone_columns, normalize_phone, phone_suffix_condition
+from utils.vitals import apply_vital_columns
 from utils.security import get_current_active_user, require_role
 
 router = APIRouter(
@@ -27,7 +46,7 @@ router = APIRouter(
 )
 async def create_patient(
     patient_data: PatientCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.DOCTOR, UserRole.ASSISTANT_CASHIER]))
 ):
     """
@@ -87,8 +106,8 @@ async def create_patient(
     
     # Add to database
     db.add(new_patient)
-    db.commit()
-    db.refresh(new_patient)
+    await db.commit()
+    await db.refresh(new_patient)
     
     # In production, log this activity to UserActivityLog
     # log_activity(current_user.id, "CREATE_PATIENT", new_patient.id)
@@ -96,32 +115,317 @@ async def create_patient(
     return new_patient
 
 
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+async def insert_patient_chunk(db: AsyncSession, rows: List[dict]) -> None:
+    """
+    Insert validated patient rows with one batched statement, plus their phonetic
+    name keys (core inserts skip the mapper events that normally write them,
+    so derived phone and vitals columns are filled here too)
+    """
+    values = [apply_vital_columns(apply_phone_columns(row)) for row in rows]
+    conn = await db.connection()
+    
+    if conn.dialect.insert_executemany_returning:
+        # Returning the name with the ID keeps batching (row order is not guaranteed)
+        result = await conn.execute(insert(Patient).returning(Patient.id, Patient.full_name), values)
+        inserted = result.all()
+    else:
+        # MySQL has no RETURNING; read the chunk back within this transaction
+        # instead of assuming consecutive IDs: rows from LAST_INSERT_ID() on that
+        # have no name keys yet (other imports' uncommitted rows are not visible)
+        result = await conn.execute(insert(Patient).values(values))
+        inserted = (await conn.execute(
+            select(Patient.id, Patient.full_name).where(
+                Patient.id >= result.lastrowid,
+                ~exists().where(PatientNameKey.patient_id == Patient.id),
+            )
+        )).all()
+    
+    key_rows = [key for patient_id, full_name in inserted for key in name_key_rows(patient_id, full_name)]
+    if key_rows:
+        await conn.execute(insert(PatientNameKey), key_rows)
+
+
+@router.post(
+    "/import",
+    response_model=ImportSummary,
+    summary="Bulk Import Patients (CSV / NDJSON)"
+)
+async def import_patients(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="Body format; defaults from Content-Type"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """
+    Stream a CSV or NDJSON file of patients into the database.
+    
+    **Body:**
+    - CSV: header row of PatientCreate field names, one patient per row
+      (empty cells are left unset)
+    - NDJSON: one PatientCreate JSON object per line
+    
+    **Process:**
+    1. Read the body as it arrives; the file is never held in memory
+    2. Validate each row against the Add New Patient form rules
+    3. Insert valid rows IMPORT_CHUNK_SIZE at a time, one transaction per chunk
+    4. Report rejected rows (by 1-based data row number) without stopping the import
+    
+    A chunk rejected by the database is rolled back and its rows reported;
+    chunks committed before it stay imported.
+    
+    **Authorization:**
+    - Requires authentication
+    - Allowed roles: Admin only
+    
+    **Errors:**
+    - 400 Bad Request: Body is not valid UTF-8
+    - 415 Unsupported Media Type: Format not given and not implied by Content-Type
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        format = IMPORT_CONTENT_TYPES.get(content_type)
+        if format is None:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson"
+            )
+    
+    summary = {"format": format, "rows_received": 0, "inserted": 0, "failed": 0,
+               "errors": [], "errors_truncated": False}
+    
+    def reject(row_number: int, errors: List[str]) -> None:
+        summary["failed"] += 1
+        if len(summary["errors"]) < settings.MAX_IMPORT_ERRORS:
+            summary["errors"].append({"row": row_number, "errors": errors})
+        else:
+            summary["errors_truncated"] = True
+    
+    async def flush(chunk: List[tuple]) -> None:
+        try:
+            await insert_patient_chunk(db, [row for _, row in chunk])
+            await db.commit()
+            summary["inserted"] += len(chunk)
+        except SQLAlchemyError as e:
+            await db.rollback()
+            message = f"Database error: {e.__class__.__name__}"
+            for row_number, _ in chunk:
+                reject(row_number, [message])
+    
+    lines = iter_text_lines(request.stream())
+    records = iter_csv_records(lines) if format == "csv" else iter_ndjson_records(lines)
+    chunk = []
+    try:
+        async for row_number, record in records:
+            summary["rows_received"] += 1
+            if isinstance(record, str):
+                reject(row_number, [record])
+                continue
+            try:
+                chunk.append((row_number, PatientCreate.model_validate(record).model_dump()))
+            except ValidationError as e:
+                reject(row_number, format_validation_errors(e.errors()))
+                continue
+            if len(chunk) >= settings.IMPORT_CHUNK_SIZE:
+                await flush(chunk)
+                chunk = []
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Body is not valid UTF-8 (stopped after {summary['inserted']} imported rows)"
+        )
+    
+    if chunk:
+        await flush(chunk)
+    
+    return summary
+
+
 @router.get(
     "",
     response_model=List[PatientOut],
     summary="Get All Patients"
 )
 async def get_all_patients(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, description="Page size (capped at MAX_PAGE_SIZE)"),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Retrieve all patient records with pagination.
+    Retrieve all patient records with pagination, ordered by ID.
     
     **Query Parameters:**
-    - skip: Number of records to skip (default: 0)
-    - limit: Maximum number of records to return (default: 100)
+    - cursor: Opaque cursor from the previous page's X-Next-Cursor header (keyset mode)
+    - skip: Number of records to skip (default: 0, offset mode; ignored with cursor)
+    - limit: Maximum number of records to return (default: 100, capped at MAX_PAGE_SIZE)
+    - include_total: Add an approximate (cached) X-Total-Count header
+    
+    **Response Headers:**
+    - X-Next-Cursor: Cursor for the next page, present when more rows may follow
+    - X-Total-Count: Approximate total, when include_total is set
+    - ETag: Fingerprint of the page; send it back as If-None-Match to get
+      304 Not Modified while no patient on it changed
     
     **Authorization:**
     - Requires authentication
     - All authenticated users can view patient list
     """
-    patients = db.query(Patient).offset(skip).limit(limit).all()
+    limit = clamp_page_size(limit)
+    query = select(Patient)
+    
+    if include_total:
+        response.headers["X-Total-Count"] = str(await approximate_count(db, "patients", query))
+    
+    if cursor:
+        # Keyset mode: seek past the last ID instead of scanning skipped rows
+        query = query.where(Patient.id > decode_cursor(cursor))
+    else:
+        query = query.offset(skip)
+    
+    result = await db.execute(query.order_by(Patient.id).limit(limit))
+    patients = result.scalars().all()
+    
+    etag = list_etag(patients)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    response.headers["ETag"] = etag
+    set_next_cursor(response, patients, limit)
     return patients
 
 
+@router.get(
+    "/export",
+    summary="Export All Patients (NDJSON / CSV)"
+)
+async def export_patients(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """
+    Download every patient record, ordered by ID, as NDJSON or CSV.
+    
+    Rows are read from a server-side cursor and written to the response as
+    they arrive, so memory use does not grow with the number of patients.
+    Columns match the patient response schema.
+    
+    **Query Parameters:**
+    - format: ndjson (default) or csv (with a header row)
+    
+    **Authorization:**
+    - Requires authentication
+    - Allowed roles: Admin only
+    """
+    columns = list(PatientOut.model_fields)
+    statement = select(*(Patient.__table__.c[column] for column in columns)).order_by(Patient.id)
+    return export_response(statement, columns, format, "patients")
+
+
+@router.post(
+    "/batch",
+    response_model=PatientBatchResponse,
+    summary="Get Several Patients by ID"
+)
+async def get_patients_batch(
+    request: PatientBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Resolve a list of patient IDs with a single IN query.
+    
+    **Body:**
+    - ids: Patient IDs (at most MAX_BATCH_SIZE)
+    
+    **Returns:**
+    - results: One entry per requested ID, in request order (null where not found)
+    - missing: Requested IDs that do not exist
+    
+    **Authorization:**
+    - Requires authentication
+    
+    **Errors:**
+    - 413 Request Entity Too Large: More than MAX_BATCH_SIZE IDs
+    """
+    if len(request.ids) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.MAX_BATCH_SIZE} IDs per batch"
+        )
+    
+    result = await db.execute(select(Patient).where(Patient.id.in_(set(request.ids))))
+    found = {patient.id: patient for patient in result.scalars()}
+    return {
+        "results": [found.get(patient_id) for patient_id in request.ids],
+        "missing": [patient_id for patient_id in dict.fromkeys(request.ids) if patient_id not in found],
+    }
+
+
+@router.get(
+    "/by-phone",
+    response_model=List[PatientOut],
+    summary="Look Up Patients by Phone Number"
+)
+async def get_patients_by_phone(
+    number: str = Query(..., min_length=4, description="Full phone number, or its last digits with match=suffix"),
+    match: Literal["exact", "suffix"] = Query("exact", description="Match the whole number or its ending"),
+    include_emergency: bool = Query(False, description="Also match emergency contact numbers (exact only)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Caller-ID style patient lookup on indexed, normalized phone numbers.
+    
+    **Query Parameters:**
+    - number: Any format ("0917 123 4567", "+63 917-123-4567"); with
+      match=suffix, the last 4 or more digits
+    - match: exact (E.164 equality) or suffix (ending digits)
+    - include_emergency: Also return patients listing the number as their
+      emergency contact
+    
+    Both modes are single B-tree index lookups, so response time does not
+    grow with the number of patients.
+    
+    **Errors:**
+    - 422 Unprocessable Entity: Number cannot be normalized
+    """
+    if match == "suffix":
+        digits = "".join(char for char in number if char.isdigit())
+        if len(digits) < 4:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Suffix lookups need at least 4 digits"
+            )
+        condition = phone_suffix_condition(digits)
+    else:
+        e164 = normalize_phone(number)
+        if e164 is None:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"'{number}' is not a valid phone number"
+            )
+        condition = Patient.phone_e164 == e164
+        if include_emergency:
+            condition = or_(condition, Patient.emergency_phone_e164 == e164)
+    
+    result = await db.execute(
+        select(Patient).where(condition).order_by(Patient.id).limit(settings.MAX_SEARCH_RESULTS)
+    )
+    return result.scalars().all()
+
+
 @router.get(
     "/{patient_id}",
     response_model=PatientOut,
@@ -129,7 +433,9 @@ async def get_all_patients(
 )
 async def get_patient(
     patient_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -138,13 +444,17 @@ async def get_patient(
     **Path Parameters:**
     - patient_id: The unique identifier of the patient
     
+    **Response Headers:**
+    - ETag: Version of the record; send it back as If-None-Match to get
+      304 Not Modified while it is unchanged, or as If-Match when updating
+    
     **Authorization:**
     - Requires authentication
     
     **Errors:**
     - 404 Not Found: Patient with specified ID does not exist
     """
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
+    patient = await db.get(Patient, patient_id)
     
     if not patient:
         raise HTTPException(
@@ -152,6 +462,11 @@ async def get_patient(
             detail=f"Patient with ID {patient_id} not found"
         )
     
+    etag = record_etag(patient)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    response.headers["ETag"] = etag
     return patient
 
 
@@ -163,12 +478,18 @@ async def get_patient(
 async def update_patient(
     patient_id: int,
     patient_data: PatientCreate,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.DOCTOR]))
 ):
     """
     Update an existing patient record.
     
+    **Request Headers:**
+    - If-Match: ETag from the last read; the update is rejected if the
+      record changed since (recommended for all edits)
+    
     **Authorization:**
     - Requires authentication
     - Allowed roles: Admin, Doctor
@@ -176,8 +497,9 @@ async def update_patient(
     **Errors:**
     - 404 Not Found: Patient does not exist
     - 403 Forbidden: User role not authorized
+    - 412 Precondition Failed: Record changed since the If-Match ETag was issued
     """
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
+    patient = await db.get(Patient, patient_id)
     
     if not patient:
         raise HTTPException(
@@ -185,13 +507,78 @@ async def update_patient(
             detail=f"Patient with ID {patient_id} not found"
         )
     
+    check_if_match(request, record_etag(patient))
+    
     # Update patient fields
     for field, value in patient_data.model_dump().items():
         setattr(patient, field, value)
     
-    db.commit()
-    db.refresh(patient)
+    await flush_versioned(db)
+    await db.commit()
+    await db.refresh(patient)
+    
+    response.headers["ETag"] = record_etag(patient)
+    return patient
+
+
+@router.patch(
+    "/{patient_id}",
+    response_model=PatientOut,
+    summary="Partially Update Patient Record"
+)
+async def patch_patient(
+    patient_id: int,
+    patient_data: PatientUpdate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.DOCTOR]))
+):
+    """
+    Change only the fields sent, e.g. new vitals after screening.
+    
+    Fields left out of the body keep their values, and the UPDATE only sets
+    columns whose value actually changed (none at all if nothing did), so
+    large text fields such as medical history are neither re-sent nor rewritten.
+    Prefer this over PUT, which requires the whole form.
+    
+    **Request Headers:**
+    - If-Match: ETag from the last read; the update is rejected if the
+      record changed since (recommended for all edits)
+    
+    **Authorization:**
+    - Requires authentication
+    - Allowed roles: Admin, Doctor
+    
+    **Errors:**
+    - 404 Not Found: Patient does not exist
+    - 403 Forbidden: User role not authorized
+    - 412 Precondition Failed: Record changed since the If-Match ETag was issued
+    - 422 Unprocessable Entity: Invalid values, or null for a required field
+    """
+    patient = await db.get(Patient, patient_id)
+    
+    if not patient:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Patient with ID {patient_id} not found"
+        )
+    
+    check_if_match(request, record_etag(patient))
+    
+    changes = {
+        field: value
+        for field, value in patient_data.model_dump(exclude_unset=True).items()
+        if getattr(patient, field) != value
+    }
+    if changes:
+        for field, value in changes.items():
+            setattr(patient, field, value)
+        await flush_versioned(db)
+        await db.commit()
+        await db.refresh(patient)
     
+    response.headers["ETag"] = record_etag(patient)
     return patient
 
 
@@ -202,7 +589,7 @@ async def update_patient(
 )
 async def delete_patient(
     patient_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN]))
 ):
     """
@@ -216,7 +603,7 @@ async def delete_patient(
     - 404 Not Found: Patient does not exist
     - 403 Forbidden: User is not Admin
     """
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
+    patient = await db.get(Patient, patient_id)
     
     if not patient:
         raise HTTPException(
@@ -224,7 +611,8 @@ async def delete_patient(
             detail=f"Patient with ID {patient_id} not found"
         )
     
-    db.delete(patient)
-    db.commit()
+    await db.delete(patient)
+    await flush_versioned(db)
+    await db.commit()
     
     return None
@@ -3,16 +3,24 @@ Search routes
 Handles searching across patients and drugs (Supporting Form: Search Records)
 """
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import List, Union, Literal
+import asyncio
 
-from config.database import get_db
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union, Literal
+
+from config.database import AsyncSessionLocal, async_engine, get_db
+from config.settings import settings
 from models.patient import Patient
 from models.drug import Drug
 from models.user import User
-from utils.schemas import PatientOut, DrugOut
+from utils.schemas import PatientOut, DrugOut, DrugSuggestion
+from utils.formulary import formulary_cache
+from utils.fulltext import apply_fulltext, fulltext_available
+from utils.names import candidate_ids_statement, trigram_similarity
+from utils.pagination import decode_cursor, encode_cursor
+from utils.phones import normalize_phone, phone_suffix_condition
 from utils.security import get_current_active_user
 
 router = APIRouter(
@@ -21,14 +29,150 @@ router = APIRouter(
 )
 
 
+def patient_search_statement(query: str, dialect_name: str):
+    """
+    Build the patient search query.
+    Queries containing digits match phone numbers on the indexed normalized
+    columns (the whole number, or its ending digits as in /patients/by-phone);
+    name queries use the full-text index (ranked by relevance) and fall back
+    to LIKE when too short.
+    """
+    statement = select(Patient)
+    
+    digits = "".join(char for char in query if char.isdigit())
+    if digits:
+        condition = phone_suffix_condition(digits)
+        e164 = normalize_phone(query)
+        if e164 is not None:
+            condition = or_(condition, Patient.phone_e164 == e164)
+        statement = statement.where(condition)
+    elif fulltext_available(dialect_name, query):
+        statement = apply_fulltext(statement, Patient, query, dialect_name)
+    else:
+        statement = statement.where(Patient.full_name.like(f"%{query}%"))
+    
+    # ID as the final sort key keeps pages stable between requests
+    return statement.order_by(Patient.id)
+
+
+def drug_search_statement(query: str, dialect_name: str):
+    """
+    Build the active-drug search query over drug ID, brand, generic name and
+    category, using the full-text index when the query is long enough
+    """
+    statement = select(Drug).where(Drug.is_active == 1)  # Only search active drugs
+    
+    if fulltext_available(dialect_name, query):
+        statement = apply_fulltext(statement, Drug, query, dialect_name)
+    else:
+        search_pattern = f"%{query}%"
+        statement = statement.where(
+            or_(
+                Drug.drug_id.like(search_pattern),
+                Drug.brand_name.like(search_pattern),
+                Drug.generic_name.like(search_pattern),
+                Drug.category.like(search_pattern)
+            )
+        )
+    
+    return statement.order_by(Drug.id)
+
+
+async def fetch_fuzzy_patient_page(db: AsyncSession, query: str, limit: int, offset: int):
+    """
+    Fuzzy name search: candidates sharing phonetic keys with the query (an
+    index lookup on patient_name_keys), ranked by trigram similarity
+    
+    Returns:
+        tuple: (rows, has_more)
+    """
+    result = await db.execute(candidate_ids_statement(query, settings.FUZZY_CANDIDATE_LIMIT))
+    candidate_ids = result.scalars().all()
+    if not candidate_ids:
+        return [], False
+    
+    # Rank on names only; full rows are loaded just for the returned page
+    result = await db.execute(select(Patient.id, Patient.full_name).where(Patient.id.in_(candidate_ids)))
+    scored = [(trigram_similarity(query, full_name), patient_id) for patient_id, full_name in result]
+    ranked = [
+        patient_id
+        for score, patient_id in sorted(scored, key=lambda item: (-item[0], item[1]))
+        if score >= settings.FUZZY_MIN_SIMILARITY
+    ]
+    page_ids = ranked[offset:offset + limit]
+    if not page_ids:
+        return [], False
+    
+    result = await db.execute(select(Patient).where(Patient.id.in_(page_ids)))
+    patients = {patient.id: patient for patient in result.scalars()}
+    page = [patients[patient_id] for patient_id in page_ids if patient_id in patients]
+    return page, len(ranked) > offset + limit
+
+
+async def fetch_search_page(db: AsyncSession, statement, limit: int, offset: int):
+    """
+    Fetch one page of search results
+    
+    Returns:
+        tuple: (rows, has_more) - reads one extra row to tell whether more follow
+    """
+    result = await db.execute(statement.offset(offset).limit(limit + 1))
+    rows = result.scalars().all()
+    return rows[:limit], len(rows) > limit
+
+
+async def count_matches(db: AsyncSession, statement, offset: int, rows: list, has_more: bool):
+    """
+    Count search matches, stopping at SEARCH_COUNT_CAP.
+    When the page already reached the last match the count is known without a query.
+    
+    Returns:
+        tuple: (count, capped) - capped is True when counting stopped at the cap
+    """
+    if not has_more:
+        return offset + len(rows), False
+    
+    capped = statement.order_by(None).limit(settings.SEARCH_COUNT_CAP).subquery()
+    result = await db.execute(select(func.count()).select_from(capped))
+    count = result.scalar_one()
+    return count, count >= settings.SEARCH_COUNT_CAP
+
+
+async def run_search_branch(statement, schema, limit: int, offset: int) -> dict:
+    """
+    Run one universal-search branch on its own session (and connection) so
+    branches can execute concurrently
+    """
+    async with AsyncSessionLocal() as session:
+        rows, has_more = await fetch_search_page(session, statement, limit, offset)
+        count, capped = await count_matches(session, statement, offset, rows, has_more)
+    
+    return {
+        "items": [schema.model_validate(row) for row in rows],
+        "count": count,
+        "capped": capped,
+        "has_more": has_more,
+    }
+
+
+def search_page_bounds(limit: int, cursor: Optional[str]):
+    """Resolve (limit, offset) from request parameters, capping limit at MAX_SEARCH_RESULTS"""
+    offset = decode_cursor(cursor, key="offset") if cursor else 0
+    return min(limit, settings.MAX_SEARCH_RESULTS), offset
+
+
 @router.get(
     "/patients",
     response_model=List[PatientOut],
     summary="Search Patients"
 )
 async def search_patients(
+    response: Response,
     query: str = Query(..., min_length=1, description="Search term for patient name or phone"),
-    db: Session = Depends(get_db),
+    limit: int = Query(50, ge=1, description="Page size (capped at MAX_SEARCH_RESULTS)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    fuzzy: bool = Query(False, description="Match misspelled or variant-spelled names"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -41,8 +185,11 @@ async def search_patients(
     2. Search Type selector (implicit: patients)
     
     **Search Fields:**
-    - Full name (partial match, case-insensitive)
-    - Phone number (partial match)
+    - Full name (partial match, case-insensitive, ranked by relevance)
+    - Phone number (whole number in any format, or its ending digits, for
+      queries containing digits)
+    - With fuzzy=true: names that sound alike (phonetic keys), ranked by
+      spelling similarity, e.g. "Jon Smyth" finds "John Smith"
     
     **Validation:**
     - Query must be at least 1 character
@@ -58,19 +205,21 @@ async def search_patients(
     - All authenticated users can search
     
     **Returns:**
-    - List of patient records matching the search criteria
+    - One page of patient records matching the search criteria
     - Empty list if no matches found
+    - X-Next-Cursor header when more matches follow
     """
-    # Search in full_name and phone_number fields
-    search_pattern = f"%{query}%"
+    limit, offset = search_page_bounds(limit, cursor)
     
-    patients = db.query(Patient).filter(
-        or_(
-            Patient.full_name.like(search_pattern),
-            Patient.phone_number.like(search_pattern)
-        )
-    ).all()
+    if fuzzy:
+        patients, has_more = await fetch_fuzzy_patient_page(db, query, limit, offset)
+    else:
+        # Search full_name (full-text index) or phone_number
+        statement = patient_search_statement(query, db.bind.dialect.name)
+        patients, has_more = await fetch_search_page(db, statement, limit, offset)
     
+    if has_more:
+        response.headers["X-Next-Cursor"] = encode_cursor(offset + limit, key="offset")
     return patients
 
 
@@ -80,8 +229,11 @@ async def search_patients(
     summary="Search Drugs"
 )
 async def search_drugs(
+    response: Response,
     query: str = Query(..., min_length=1, description="Search term for drug ID, brand name, or generic name"),
-    db: Session = Depends(get_db),
+    limit: int = Query(50, ge=1, description="Page size (capped at MAX_SEARCH_RESULTS)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -98,6 +250,7 @@ async def search_drugs(
     - Brand name (partial match, case-insensitive)
     - Generic name (partial match, case-insensitive)
     - Category (partial match, case-insensitive)
+    - Results are ranked by relevance
     
     **Validation:**
     - Query must be at least 1 character
@@ -114,25 +267,58 @@ async def search_drugs(
     - All authenticated users can search formulary
     
     **Returns:**
-    - List of drug records matching the search criteria
+    - One page of drug records matching the search criteria
     - Empty list if no matches found
+    - X-Next-Cursor header when more matches follow
     """
+    limit, offset = search_page_bounds(limit, cursor)
+    
     # Search in multiple fields
-    search_pattern = f"%{query}%"
-    
-    drugs = db.query(Drug).filter(
-        Drug.is_active == 1,  # Only search active drugs
-        or_(
-            Drug.drug_id.like(search_pattern),
-            Drug.brand_name.like(search_pattern),
-            Drug.generic_name.like(search_pattern),
-            Drug.category.like(search_pattern)
-        )
-    ).all()
+    statement = drug_search_statement(query, db.bind.dialect.name)
+    drugs, has_more = await fetch_search_page(db, statement, limit, offset)
     
+    if has_more:
+        response.headers["X-Next-Cursor"] = encode_cursor(offset + limit, key="offset")
     return drugs
 
 
+@router.get(
+    "/drugs/suggest",
+    response_model=List[DrugSuggestion],
+    summary="Drug Name Typeahead"
+)
+async def suggest_drugs(
+    prefix: str = Query(..., min_length=1, description="Start of a brand name, generic name or drug ID"),
+    limit: int = Query(10, ge=1, description="Maximum suggestions (capped at MAX_SUGGESTIONS)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    As-you-type suggestions for the pharmacy counter.
+    
+    Matches the start of any word in the brand or generic name, or the start
+    of the drug ID, against an in-memory prefix index kept in step with the
+    formulary cache. Only active drugs are suggested.
+    
+    **Returns:**
+    - Up to `limit` compact suggestions in alphabetical order of the matched
+      text, with the field that matched
+    """
+    matches = await formulary_cache.suggest(db, prefix, min(limit, settings.MAX_SUGGESTIONS))
+    return [
+        DrugSuggestion(
+            id=drug.id,
+            drug_id=drug.drug_id,
+            brand_name=drug.brand_name,
+            generic_name=drug.generic_name,
+            strength=drug.strength,
+            dosage_form=drug.dosage_form,
+            matched_field=field,
+        )
+        for drug, field in matches
+    ]
+
+
 @router.get(
     "",
     summary="Universal Search Endpoint"
@@ -140,7 +326,8 @@ async def search_drugs(
 async def universal_search(
     query: str = Query(..., min_length=1, description="Search term"),
     scope: Literal['patients', 'drugs', 'all'] = Query('all', description="Search scope"),
-    db: Session = Depends(get_db),
+    limit: int = Query(50, ge=1, description="Page size per scope (capped at MAX_SEARCH_RESULTS)"),
+    cursor: Optional[str] = Query(None, description="next_cursor value from the previous page"),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -155,10 +342,20 @@ async def universal_search(
     **Query Parameters:**
     - query: The search term
     - scope: Where to search ('patients', 'drugs', or 'all')
+    - limit: Results per scope in one page (capped at MAX_SEARCH_RESULTS)
+    - cursor: next_cursor from the previous response
     
     **Returns:**
-    - JSON object with separate lists for patients and drugs
-    - Includes count of results in each category
+    - JSON object with separate lists for patients and drugs (one page each)
+    - Includes count of results in each category; counts stop at
+      SEARCH_COUNT_CAP and counts_capped is true when a cap was hit
+    - next_cursor for the following page, or null on the last page
+    - partial is true when a scope did not finish within
+      SEARCH_BRANCH_TIMEOUT_SECONDS; timed_out lists those scopes and their
+      results are returned empty
+    
+    With scope 'all' the patient and drug searches run concurrently on
+    separate database connections.
     
     **Example Response:**
     ```json
@@ -173,44 +370,64 @@ async def universal_search(
             "patients": 2,
             "drugs": 0,
             "total": 2
-        }
+        },
+        "counts_capped": false,
+        "next_cursor": null,
+        "partial": false,
+        "timed_out": []
     }
     ```
     """
-    search_pattern = f"%{query}%"
+    limit, offset = search_page_bounds(limit, cursor)
+    dialect_name = async_engine.dialect.name
     results = {
         "query": query,
         "scope": scope,
         "results": {},
-        "counts": {}
+        "counts": {},
+        "counts_capped": False,
+        "next_cursor": None,
+        "partial": False,
+        "timed_out": []
     }
     
-    # Search patients if requested
+    # Build the requested branches (patients and/or drugs)
+    branches = {}
     if scope in ['patients', 'all']:
-        patients = db.query(Patient).filter(
-            or_(
-                Patient.full_name.like(search_pattern),
-                Patient.phone_number.like(search_pattern)
-            )
-        ).all()
-        results["results"]["patients"] = [PatientOut.model_validate(p) for p in patients]
-        results["counts"]["patients"] = len(patients)
-    
-    # Search drugs if requested
+        branches["patients"] = run_search_branch(
+            patient_search_statement(query, dialect_name), PatientOut, limit, offset
+        )
     if scope in ['drugs', 'all']:
-        drugs = db.query(Drug).filter(
-            Drug.is_active == 1,
-            or_(
-                Drug.drug_id.like(search_pattern),
-                Drug.brand_name.like(search_pattern),
-                Drug.generic_name.like(search_pattern),
-                Drug.category.like(search_pattern)
-            )
-        ).all()
-        results["results"]["drugs"] = [DrugOut.model_validate(d) for d in drugs]
-        results["counts"]["drugs"] = len(drugs)
+        branches["drugs"] = run_search_branch(
+            drug_search_statement(query, dialect_name), DrugOut, limit, offset
+        )
+    
+    # Run them concurrently, each with its own timeout
+    outcomes = await asyncio.gather(
+        *[asyncio.wait_for(branch, timeout=settings.SEARCH_BRANCH_TIMEOUT_SECONDS) for branch in branches.values()],
+        return_exceptions=True
+    )
+    
+    any_more = False
+    for name, outcome in zip(branches, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            results["results"][name] = []
+            results["counts"][name] = 0
+            results["timed_out"].append(name)
+            continue
+        if isinstance(outcome, BaseException):
+            raise outcome
+        
+        results["results"][name] = outcome["items"]
+        results["counts"][name] = outcome["count"]
+        results["counts_capped"] = results["counts_capped"] or outcome["capped"]
+        any_more = any_more or outcome["has_more"]
     
     # Calculate total count
     results["counts"]["total"] = sum(results["counts"].values())
+    results["partial"] = bool(results["timed_out"])
+    
+    if any_more:
+        results["next_cursor"] = encode_cursor(offset + limit, key="offset")
     
     return results
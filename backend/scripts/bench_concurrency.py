@@ -0,0 +1,113 @@
+"""
+Concurrent request benchmark
+Drives a running server with a mix of slow requests (patient search) and
+fast ones (patient by ID) from many concurrent clients, while a probe
+times GET /health. When handlers block the event loop, the probe and the
+fast requests queue behind every slow one; on the async database path they
+do not.
+
+Usage (server started separately, database already holding patients):
+    DATABASE_URL=sqlite:///./bench.db uvicorn main:app --port 8000
+    python scripts/bench_concurrency.py --concurrency 1,8,32 --duration 10
+
+Requires httpx (pip install httpx).
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+import httpx
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated client counts to run")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--slow-ratio", type=float, default=0.2, help="Share of requests that are searches")
+    # A term matching few rows keeps the cost in the database scan rather
+    # than in building and serializing a large result on the event loop
+    parser.add_argument("--query", default="12345", help="Patient search term for the slow requests")
+    parser.add_argument("--max-patient-id", type=int, default=1000, help="Fast requests fetch IDs 1..N")
+    return parser.parse_args()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_level(args, headers, clients: int) -> dict:
+    latencies = {"slow": [], "fast": [], "health": []}
+    errors = 0
+    deadline = time.perf_counter() + args.duration
+
+    async def timed(client, kind, path, **params):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            response = await client.get(path, params=params)
+            if response.status_code >= 400:
+                errors += 1
+        except httpx.HTTPError:
+            errors += 1
+        latencies[kind].append((time.perf_counter() - started) * 1000)
+
+    async def worker(client):
+        while time.perf_counter() < deadline:
+            if random.random() < args.slow_ratio:
+                await timed(client, "slow", "/search/patients", query=args.query)
+            else:
+                await timed(client, "fast", f"/patients/{random.randint(1, args.max_patient_id)}")
+
+    async def probe(client):
+        while time.perf_counter() < deadline:
+            await timed(client, "health", "/health")
+            await asyncio.sleep(0.05)
+
+    limits = httpx.Limits(max_connections=clients + 1)
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, timeout=120, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(probe(client), *(worker(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    completed = len(latencies["slow"]) + len(latencies["fast"])
+    return {
+        "clients": clients,
+        "rps": completed / elapsed,
+        "slow_p50": percentile(latencies["slow"], 50),
+        "fast_p50": percentile(latencies["fast"], 50),
+        "fast_p95": percentile(latencies["fast"], 95),
+        "health_p95": percentile(latencies["health"], 95),
+        "health_max": max(latencies["health"], default=float("nan")),
+        "errors": errors,
+    }
+
+
+async def main() -> int:
+    args = parse_args()
+    login = httpx.post(f"{args.base_url}/auth/login", json={"username": args.username, "password": args.password})
+    login.raise_for_status()
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    header = f"{'clients':>7} {'req/s':>8} {'search p50':>11} {'by-id p50':>10} {'by-id p95':>10} {'health p95':>11} {'health max':>11} {'errors':>6}"
+    print(header)
+    print("-" * len(header))
+    for clients in (int(value) for value in args.concurrency.split(",")):
+        row = await run_level(args, headers, clients)
+        print(
+            f"{row['clients']:>7} {row['rps']:>8.1f} {row['slow_p50']:>9.1f}ms {row['fast_p50']:>8.1f}ms "
+            f"{row['fast_p95']:>8.1f}ms {row['health_p95']:>9.1f}ms {row['health_max']:>9.1f}ms {row['errors']:>6}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
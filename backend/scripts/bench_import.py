@@ -0,0 +1,146 @@
+"""
+Bulk patient import benchmark
+For each IMPORT_CHUNK_SIZE and body format, builds a fresh SQLite database
+with init_db.py, starts uvicorn, streams a generated CSV or NDJSON body of
+synthetic patients to POST /patients/import and reports rows per second
+end to end (upload, validation, inserts, name keys and full-text triggers).
+
+Usage (from the backend directory):
+    python scripts/bench_import.py --rows 50000 --chunk-sizes 500,1000,2000,5000 --formats csv,ndjson
+
+Requires httpx (pip install httpx).
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+FIRST_NAMES = ("Juan", "Maria", "Jose", "Ana", "Pedro", "Rosa", "Luis", "Carmen", "Miguel", "Sofia", "Ramon", "Elena")
+LAST_NAMES = ("Santos", "Reyes", "Cruz", "Bautista", "Garcia", "Mendoza", "Torres", "Flores", "Ramos", "Aquino")
+FIELDS = (
+    "full_name", "age", "gender", "date_of_birth", "phone_number", "address",
+    "weight_kg", "blood_pressure", "temperature", "heart_rate", "allergies",
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=50000, help="Patients per import")
+    parser.add_argument("--chunk-sizes", default="500,1000,2000,5000", help="Comma-separated IMPORT_CHUNK_SIZE values")
+    parser.add_argument("--formats", default="csv,ndjson", help="Comma-separated body formats")
+    parser.add_argument("--port", type=int, default=8791)
+    return parser.parse_args()
+
+
+def patient_records(count: int):
+    rng = random.Random(count)
+    for index in range(count):
+        age = rng.randint(1, 95)
+        yield {
+            "full_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "age": age,
+            "gender": rng.choice(("Male", "Female")),
+            "date_of_birth": f"{2025 - age}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "phone_number": f"0917{index:07d}",
+            "address": f"{rng.randint(1, 999)} Rizal Ave., Manila",
+            "weight_kg": f"{rng.uniform(3, 110):.1f}",
+            "blood_pressure": f"{rng.randint(95, 160)}/{rng.randint(60, 94)}",
+            "temperature": f"{rng.uniform(36.0, 39.5):.1f}°C",
+            "heart_rate": rng.randint(55, 120),
+            "allergies": rng.choice(("None", "Penicillin", "Shellfish", "Sulfa drugs")),
+        }
+
+
+def build_body(format: str, count: int) -> bytes:
+    """The whole upload, built up front so generation is not timed"""
+    if format == "ndjson":
+        return "".join(json.dumps(record) + "\n" for record in patient_records(count)).encode("utf-8")
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(patient_records(count))
+    return buffer.getvalue().encode("utf-8")
+
+
+def stream(body: bytes, size: int = 64 * 1024):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def start_server(args, chunk_size: int, database: Path) -> subprocess.Popen:
+    """Create a fresh database and start uvicorn with this chunk size"""
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}", "IMPORT_CHUNK_SIZE": str(chunk_size)}
+    subprocess.run(
+        [sys.executable, "init_db.py"], cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True,
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{args.port}/health").raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("server did not start")
+
+
+def run_import(args, format: str, body: bytes) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    token = httpx.post(f"{base_url}/auth/login", json={"username": "admin", "password": "admin123"})
+    token.raise_for_status()
+    content_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Authorization": f"Bearer {token.json()['access_token']}", "Content-Type": content_type}
+
+    started = time.perf_counter()
+    response = httpx.post(f"{base_url}/patients/import", content=stream(body), headers=headers, timeout=600)
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    summary = response.json()
+    return {"inserted": summary["inserted"], "failed": summary["failed"], "seconds": elapsed}
+
+
+def main() -> int:
+    args = parse_args()
+    formats = args.formats.split(",")
+    bodies = {format: build_body(format, args.rows) for format in formats}
+
+    print(f"{args.rows:,} patients per import, SQLite")
+    header = f"{'format':<7} {'chunk':>6} {'MB':>6} {'seconds':>8} {'rows/s':>8} {'failed':>7}"
+    print(header)
+    print("-" * len(header))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for format in formats:
+            for chunk_size in (int(value) for value in args.chunk_sizes.split(",")):
+                server = start_server(args, chunk_size, Path(workdir) / f"import-{format}-{chunk_size}.db")
+                try:
+                    row = run_import(args, format, bodies[format])
+                finally:
+                    server.terminate()
+                    server.wait()
+                print(
+                    f"{format:<7} {chunk_size:>6} {len(bodies[format]) / 1e6:>6.1f} {row['seconds']:>8.2f} "
+                    f"{row['inserted'] / row['seconds']:>8.0f} {row['failed']:>7}"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Login throughput benchmark
+For each bcrypt cost factor, builds a fresh SQLite database with init_db.py
+(so the seeded passwords are hashed at that cost), starts uvicorn with
+BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS and PASSWORD_HASH_QUEUE_SIZE set, and
+fires concurrent POST /auth/token logins while a probe times GET /health.
+Reports successful logins per second, the share of fast 503s from a
+saturated hash pool, and how long other requests waited.
+
+Usage (from the backend directory):
+    python scripts/bench_login.py --rounds 10,12,14 --workers 4 --queue-size 32 --clients 64
+
+Requires httpx (pip install httpx).
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rounds", default="10,12,14", help="Comma-separated BCRYPT_ROUNDS values")
+    parser.add_argument("--workers", type=int, default=4, help="PASSWORD_HASH_WORKERS")
+    parser.add_argument("--queue-size", type=int, default=32, help="PASSWORD_HASH_QUEUE_SIZE")
+    parser.add_argument("--clients", type=int, default=64, help="Concurrent login clients")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per cost factor")
+    parser.add_argument("--port", type=int, default=8790)
+    return parser.parse_args()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def start_server(args, rounds: int, database: Path) -> subprocess.Popen:
+    """Seed a fresh database at this cost factor and start uvicorn on it"""
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{database}",
+        "BCRYPT_ROUNDS": str(rounds),
+        "PASSWORD_HASH_WORKERS": str(args.workers),
+        "PASSWORD_HASH_QUEUE_SIZE": str(args.queue_size),
+    }
+    subprocess.run(
+        [sys.executable, "init_db.py"], cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True,
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{base_url}/health").raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("server did not start")
+
+
+async def run_load(args) -> dict:
+    statuses = {}
+    login_times, health_times = [], []
+    deadline = time.perf_counter() + args.duration
+
+    async def login(client):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.post("/auth/token", data={"username": "admin", "password": "admin123"})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                login_times.append((time.perf_counter() - started) * 1000)
+            elif response.status_code == 503:
+                # Honour Retry-After loosely so rejected clients do not spin
+                await asyncio.sleep(0.1)
+
+    async def probe(client):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await client.get("/health")
+            health_times.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(0.05)
+
+    limits = httpx.Limits(max_connections=args.clients + 1)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=120, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(probe(client), *(login(client) for _ in range(args.clients)))
+        elapsed = time.perf_counter() - started
+
+    attempts = sum(statuses.values())
+    return {
+        "logins_per_second": statuses.get(200, 0) / elapsed,
+        "rejected_pct": 100 * statuses.get(503, 0) / attempts if attempts else 0.0,
+        "login_p50": percentile(login_times, 50),
+        "login_p95": percentile(login_times, 95),
+        "health_p95": percentile(health_times, 95),
+        "other": {code: count for code, count in statuses.items() if code not in (200, 503)},
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    print(f"PASSWORD_HASH_WORKERS={args.workers} PASSWORD_HASH_QUEUE_SIZE={args.queue_size} clients={args.clients}")
+    header = f"{'rounds':>6} {'logins/s':>9} {'503 %':>6} {'login p50':>10} {'login p95':>10} {'health p95':>11}  other"
+    print(header)
+    print("-" * len(header))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rounds in (int(value) for value in args.rounds.split(",")):
+            server = start_server(args, rounds, Path(workdir) / f"login-{rounds}.db")
+            try:
+                row = asyncio.run(run_load(args))
+            finally:
+                server.terminate()
+                server.wait()
+            print(
+                f"{rounds:>6} {row['logins_per_second']:>9.1f} {row['rejected_pct']:>5.1f}% "
+                f"{row['login_p50']:>8.0f}ms {row['login_p95']:>8.0f}ms {row['health_p95']:>9.1f}ms  {row['other'] or ''}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Patient update write-amplification benchmark: PUT vs PATCH
+Builds a fresh SQLite database with init_db.py, runs the app in-process and
+captures every UPDATE patients statement the requests emit. For a few
+typical edits of a patient with long clinical notes, reports the request
+body size, UPDATE statements, columns in their SET clause and bytes of bound
+values for a full-body PUT and for a PATCH of just the changed fields.
+
+Usage (from the backend directory):
+    python scripts/bench_patch.py
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+PATIENT = {
+    "full_name": "Maria Clara Santos",
+    "age": 54,
+    "gender": "Female",
+    "date_of_birth": "1972-03-14",
+    "phone_number": "0917 123 4567",
+    "address": "Blk 12 Lot 7, Sampaguita St., Brgy. San Isidro, Quezon City, Metro Manila " * 3,
+    "emergency_contact": "Jose Santos",
+    "relationship": "Spouse",
+    "emergency_phone": "0918 765 4321",
+    "height_cm": 158,
+    "weight_kg": "61.5",
+    "blood_pressure": "130/85",
+    "temperature": "36.8°C",
+    "heart_rate": 78,
+    "allergies": "Penicillin (rash, 2009); shellfish; latex gloves cause contact dermatitis. " * 3,
+    "symptoms": "Intermittent frontal headache for two weeks, worse in the morning, mild nausea. " * 6,
+    "diagnosis": "Essential hypertension, stage 1; tension-type headache; rule out secondary causes. " * 5,
+    "medical_history": "Type 2 diabetes since 2015 on metformin; appendectomy 1998; G3P3. " * 14,
+}
+
+# (label, changed fields)
+EDITS = (
+    ("vitals", {"blood_pressure": "142/90", "heart_rate": 84}),
+    ("one note", {"diagnosis": "Essential hypertension, stage 2; tension-type headache."}),
+    ("no change", {}),
+)
+
+SET_COLUMN = re.compile(r"(\w+)\s*=")
+
+
+def set_columns(statement: str) -> list:
+    """Column names assigned in an UPDATE statement's SET clause"""
+    clause = statement.split(" SET ", 1)[1].split(" WHERE ", 1)[0]
+    return SET_COLUMN.findall(clause)
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = f"sqlite:///{Path(workdir) / 'patch.db'}"
+        os.environ["DATABASE_URL"] = database_url
+        subprocess.run(
+            [sys.executable, "init_db.py"], cwd=BACKEND_DIR, env=os.environ,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True,
+        )
+
+        from fastapi.testclient import TestClient
+        from sqlalchemy import event
+
+        from config.database import async_engine
+        from main import app
+
+        captured = []
+
+        @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("UPDATE PATIENTS"):
+                captured.append((statement, parameters))
+
+        with TestClient(app) as client:
+            token = client.post("/auth/login", json={"username": "admin", "password": "admin123"})
+            token.raise_for_status()
+            headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+
+            header = (
+                f"{'edit':<10} {'method':<6} {'body bytes':>10} {'UPDATEs':>8} "
+                f"{'SET columns':>11} {'bound bytes':>11}  columns"
+            )
+            print(header)
+            print("-" * len(header))
+
+            for label, changes in EDITS:
+                for method in ("PUT", "PATCH"):
+                    created = client.post("/patients", json=PATIENT, headers=headers)
+                    created.raise_for_status()
+                    patient_id = created.json()["id"]
+
+                    body = json.dumps({**PATIENT, **changes} if method == "PUT" else changes).encode("utf-8")
+                    captured.clear()
+                    response = client.request(
+                        method, f"/patients/{patient_id}", content=body,
+                        headers={**headers, "Content-Type": "application/json"},
+                    )
+                    response.raise_for_status()
+
+                    columns = [name for statement, _ in captured for name in set_columns(statement)]
+                    bound = sum(
+                        len(str(value).encode("utf-8"))
+                        for _, parameters in captured for value in parameters
+                        if value is not None
+                    )
+                    print(
+                        f"{label:<10} {method:<6} {len(body):>10} {len(captured):>8} "
+                        f"{len(columns):>11} {bound:>11}  {', '.join(columns) or '-'}"
+                    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
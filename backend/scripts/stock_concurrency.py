@@ -0,0 +1,105 @@
+"""
+Concurrent stock adjustment check
+Hammers POST /drugs/{id}/stock from many threads against a running server
+and verifies that no adjustment was lost, stock never went negative, and
+every worker's formulary cache converged on the database value.
+
+Usage (server started separately, ideally with several workers):
+    uvicorn main:app --port 8000 --workers 4
+    python scripts/stock_concurrency.py --username pharmacist --password ...
+
+Requires httpx (pip install httpx).
+"""
+
+import argparse
+import sys
+import threading
+import time
+from collections import Counter
+
+import httpx
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=50, help="Adjustments per thread")
+    parser.add_argument("--stock", type=int, default=1000, help="Starting quantity of the test drug")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    base = args.base_url.rstrip("/")
+
+    token = httpx.post(f"{base}/auth/login", json={"username": args.username, "password": args.password})
+    token.raise_for_status()
+    headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+
+    code = f"ST-{int(time.time()) % 10**8}"
+    created = httpx.post(f"{base}/drugs", headers=headers, json={
+        "drug_id": code,
+        "brand_name": "Stock Check",
+        "generic_name": "Placebo",
+        "dosage_form": "Tablet",
+        "strength": "1 mg",
+        "category": "Test",
+        "quantity_in_stock": args.stock,
+        "unit_price": 1.0,
+    })
+    created.raise_for_status()
+    drug_pk = created.json()["id"]
+
+    # Remove more units in total than exist, so some requests must get 409
+    codes = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.threads)
+
+    def worker(index: int):
+        delta = 1 if index % 4 == 0 else -2
+        with httpx.Client(base_url=base, headers=headers, timeout=60) as client:
+            barrier.wait()
+            for _ in range(args.requests):
+                response = client.post(f"/drugs/{drug_pk}/stock", json={"delta": delta, "reason": "concurrency check"})
+                with lock:
+                    codes[(delta, response.status_code)] += 1
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    applied = sum(delta * count for (delta, status), count in codes.items() if status == 200)
+    expected = args.stock + applied
+    total = sum(codes.values())
+    print(f"{total} adjustments in {elapsed:.2f}s ({total / elapsed:.0f}/s)")
+    for (delta, status), count in sorted(codes.items()):
+        print(f"  delta {delta:+d} -> {status}: {count}")
+
+    # The cached read path must converge once every worker re-checked its version
+    time.sleep(3)
+    with httpx.Client(base_url=base, headers=headers, timeout=60) as client:
+        cached = {client.get(f"/drugs/{drug_pk}").json()["quantity_in_stock"] for _ in range(4 * args.threads)}
+        client.delete(f"/drugs/{drug_pk}", params={"permanent": True})
+
+    failures = []
+    if any(status >= 500 for _, status in codes):
+        failures.append("server errors")
+    if cached != {expected}:
+        failures.append(f"cached quantities {sorted(cached)} != expected {expected}")
+    if expected < 0:
+        failures.append("stock went negative")
+
+    print(f"expected quantity {expected}, served {sorted(cached)}")
+    print("FAIL: " + "; ".join(failures) if failures else "OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,16 +2,22 @@
 
 from .security import (
     verify_password,
+    verify_password_async,
     get_password_hash,
     create_access_token,
+    create_refresh_token,
+    hash_refresh_token,
     get_current_user,
     get_current_active_user
 )
 
 __all__ = [
     "verify_password",
+    "verify_password_async",
     "get_password_hash",
     "create_access_token",
+    "create_refresh_token",
+    "hash_refresh_token",
     "get_current_user",
     "get_current_active_user"
 ]
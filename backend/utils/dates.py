@@ -0,0 +1,46 @@
+"""
+Expiry date parsing
+Drug expiry dates used to be free-form text; these helpers read the formats
+found on packaging and in older records
+"""
+
+import calendar
+import re
+from datetime import date, datetime
+from typing import Optional
+
+# Full dates, tried in order (day-first only when the month is spelled out)
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%m-%d-%Y", "%d-%b-%Y", "%d %b %Y", "%b %d %Y", "%B %d %Y", "%d %B %Y")
+
+# Month and year only ("EXP 12/2025"): the drug expires at the end of that month
+MONTH_FORMATS = ("%Y-%m", "%Y/%m", "%m/%Y", "%m-%Y", "%b %Y", "%B %Y", "%b-%Y", "%m/%y")
+
+
+def parse_expiry_date(raw: Optional[str]) -> Optional[date]:
+    """
+    Parse an expiry date such as "2025-12-31", "12/31/2025", "31-Dec-2025" or "12/2025"
+
+    Returns:
+        Optional[date]: The date (last day of the month for month-only values),
+        or None for empty or unrecognized text
+    """
+    if not raw:
+        return None
+
+    text = re.sub(r"^(exp(iry|ires)?\.?:?)\s*", "", raw.strip(), flags=re.IGNORECASE)
+    text = " ".join(text.replace(",", " ").split())
+
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+
+    for fmt in MONTH_FORMATS:
+        try:
+            month = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        return date(month.year, month.month, calendar.monthrange(month.year, month.month)[1])
+
+    return None
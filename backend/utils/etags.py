@@ -0,0 +1,63 @@
+"""
+ETags for patient and drug records
+Derived from each row's version column: record ETags let clients revalidate
+with If-None-Match (304) and guard updates with If-Match (412)
+"""
+
+import hashlib
+from typing import Iterable, Optional
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+
+
+def record_etag(record) -> str:
+    """Strong ETag of one record (any object with id and version)"""
+    return f'"{record.id}.{record.version}"'
+
+
+def list_etag(records: Iterable) -> str:
+    """ETag of a page of records; changes when any row on it is added, removed or updated"""
+    digest = hashlib.sha1(",".join(f"{record.id}.{record.version}" for record in records).encode())
+    return f'"{digest.hexdigest()[:20]}"'
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    """
+    Whether an If-Match / If-None-Match header lists etag (or is *).
+    If-Match uses strong comparison (weak=False): W/ tags never match.
+    """
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates or (weak and f"W/{etag}" in candidates)
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response if the client's If-None-Match already has etag, else None"""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
+
+
+def check_if_match(request: Request, etag: str) -> None:
+    """Reject a write whose If-Match header names an older version (no header: allowed)"""
+    header = request.headers.get("if-match")
+    if header and not etag_matches(header, etag, weak=False):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Record was modified since it was read; fetch it again and retry"
+        )
+
+
+async def flush_versioned(db: AsyncSession) -> None:
+    """Flush pending ORM changes, turning a lost version race (StaleDataError) into 412"""
+    try:
+        await db.flush()
+    except StaleDataError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Record was modified by another request; fetch it again and retry"
+        )
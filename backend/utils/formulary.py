@@ -0,0 +1,252 @@
+"""
+In-memory formulary cache
+Keeps a process-local snapshot of the drugs table indexed by id and drug_id,
+plus running per-category stock totals. Drug write paths update it directly
+(write-through) and bump the shared "formulary" row in cache_versions so
+other workers notice and reload. Stock adjustments skip the bump (it would
+lock one row for every dispense); other workers pick them up by comparing
+per-drug row versions instead.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+from models.drug import Drug
+from utils.cache import read_cache_version
+from utils.schemas import DrugOut
+from utils.suggest import DrugSuggestIndex
+
+FORMULARY_CACHE_NAME = "formulary"
+
+
+class FormularyCache:
+    """
+    Snapshot of all drugs (active and archived) as DrugOut objects.
+    Reads re-check the shared version at most every
+    FORMULARY_VERSION_CHECK_SECONDS and reload when another worker wrote;
+    when it is unchanged, only drugs whose row version moved are re-read.
+    """
+
+    def __init__(self):
+        self.version: Optional[int] = None  # None until the first load
+        self.reloads = 0
+        self.row_refreshes = 0
+        self._by_id: Dict[int, DrugOut] = {}
+        self._id_by_code: Dict[str, int] = {}
+        self._sorted_ids: List[int] = []
+        self._suggest_index = DrugSuggestIndex()
+        # Active drugs only: category -> running totals, and (quantity, id) sorted for low-stock lookups
+        self._category_totals: Dict[str, dict] = {}
+        self._stock_levels: List[Tuple[int, int]] = []
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """Load the snapshot, or reload it if the shared version moved on"""
+        if self.version is not None and time.monotonic() - self._checked_at < settings.FORMULARY_VERSION_CHECK_SECONDS:
+            return
+
+        async with self._lock:
+            if self.version is not None and time.monotonic() - self._checked_at < settings.FORMULARY_VERSION_CHECK_SECONDS:
+                return
+
+            current = await read_cache_version(db, FORMULARY_CACHE_NAME)
+            if current != self.version:
+                # Read the version first: a write landing in between only causes one extra reload
+                result = await db.execute(select(Drug))
+                self._replace([DrugOut.model_validate(drug) for drug in result.scalars()])
+                self.version = current
+                self.reloads += 1
+            else:
+                await self._refresh_changed_rows(db)
+            self._checked_at = time.monotonic()
+
+    async def _refresh_changed_rows(self, db: AsyncSession) -> None:
+        """Re-read drugs updated in place without a version bump (stock adjustments in other workers)"""
+        result = await db.execute(select(Drug.id, Drug.version))
+        changed = [
+            drug_pk for drug_pk, version in result
+            if drug_pk in self._by_id and self._by_id[drug_pk].version < version
+        ]
+        if not changed:
+            return
+        result = await db.execute(select(Drug).where(Drug.id.in_(changed)))
+        for drug in result.scalars():
+            self._put(DrugOut.model_validate(drug))
+        self.row_refreshes += len(changed)
+
+    def _replace(self, drugs: List[DrugOut]) -> None:
+        self._by_id = {drug.id: drug for drug in drugs}
+        self._id_by_code = {drug.drug_id: drug.id for drug in drugs}
+        self._sorted_ids = sorted(self._by_id)
+        self._suggest_index.rebuild(drugs)
+        self._category_totals = {}
+        for drug in drugs:
+            self._count_stock(drug, 1)
+        self._stock_levels = sorted((drug.quantity_in_stock, drug.id) for drug in drugs if drug.is_active)
+
+    def _count_stock(self, drug: DrugOut, sign: int) -> None:
+        """Add (sign=1) or subtract (sign=-1) an active drug from its category totals"""
+        if not drug.is_active:
+            return
+        totals = self._category_totals.setdefault(
+            drug.category, {"drug_count": 0, "units_in_stock": 0, "stock_value": 0.0}
+        )
+        totals["drug_count"] += sign
+        totals["units_in_stock"] += sign * drug.quantity_in_stock
+        totals["stock_value"] += sign * drug.quantity_in_stock * drug.unit_price
+        if totals["drug_count"] == 0:
+            del self._category_totals[drug.category]
+
+    def _remove(self, drug_pk: int) -> None:
+        old = self._by_id.pop(drug_pk, None)
+        if old is None:
+            return
+        self._suggest_index.remove(drug_pk)
+        self._id_by_code.pop(old.drug_id, None)
+        index = bisect_left(self._sorted_ids, drug_pk)
+        if index < len(self._sorted_ids) and self._sorted_ids[index] == drug_pk:
+            del self._sorted_ids[index]
+        if old.is_active:
+            self._count_stock(old, -1)
+            index = bisect_left(self._stock_levels, (old.quantity_in_stock, drug_pk))
+            if index < len(self._stock_levels) and self._stock_levels[index] == (old.quantity_in_stock, drug_pk):
+                del self._stock_levels[index]
+
+    def mark_stale(self) -> None:
+        """Re-check the shared version on the next read (after bulk writes)"""
+        self._checked_at = 0.0
+
+    def apply_write(self, drug_pk: int, drug: Optional[Drug], new_version: int) -> None:
+        """
+        Write-through after a committed change to one drug
+
+        Args:
+            drug_pk: Database ID of the drug written
+            drug: The refreshed drug row, or None if it was deleted
+            new_version: Version returned by bump_cache_version for this write
+        """
+        if self.version is None:
+            return
+
+        if new_version != self.version + 1:
+            # Another worker wrote in between; reload on the next read
+            self.mark_stale()
+            return
+
+        self._remove(drug_pk)
+        if drug is not None:
+            self._add(DrugOut.model_validate(drug))
+        self.version = new_version
+
+    def apply_row_update(self, drug: Drug) -> None:
+        """
+        Write-through after a committed in-place change that did not bump the
+        shared version (stock adjustments); older row versions are ignored
+        """
+        if self.version is None:
+            return
+        self._put(DrugOut.model_validate(drug))
+
+    def _add(self, snapshot: DrugOut) -> None:
+        self._by_id[snapshot.id] = snapshot
+        self._id_by_code[snapshot.drug_id] = snapshot.id
+        insort(self._sorted_ids, snapshot.id)
+        self._suggest_index.add(snapshot)
+        if snapshot.is_active:
+            self._count_stock(snapshot, 1)
+            insort(self._stock_levels, (snapshot.quantity_in_stock, snapshot.id))
+
+    def _put(self, snapshot: DrugOut) -> None:
+        """Replace a cached drug with a newer row version of it"""
+        current = self._by_id.get(snapshot.id)
+        if current is None or current.version >= snapshot.version:
+            return
+        self._remove(snapshot.id)
+        self._add(snapshot)
+
+    async def get(self, db: AsyncSession, drug_pk: int) -> Optional[DrugOut]:
+        await self.ensure_fresh(db)
+        return self._by_id.get(drug_pk)
+
+    async def get_by_code(self, db: AsyncSession, drug_code: str) -> Optional[DrugOut]:
+        await self.ensure_fresh(db)
+        drug_pk = self._id_by_code.get(drug_code)
+        return self._by_id.get(drug_pk) if drug_pk is not None else None
+
+    async def list(
+        self,
+        db: AsyncSession,
+        active_only: bool,
+        limit: int,
+        after_id: Optional[int] = None,
+        skip: int = 0,
+    ) -> List[DrugOut]:
+        """Drugs ordered by ID, after a keyset cursor or an offset"""
+        await self.ensure_fresh(db)
+        start = bisect_right(self._sorted_ids, after_id) if after_id is not None else 0
+
+        page = []
+        to_skip = 0 if after_id is not None else skip
+        for drug_pk in self._sorted_ids[start:]:
+            drug = self._by_id[drug_pk]
+            if active_only and not drug.is_active:
+                continue
+            if to_skip:
+                to_skip -= 1
+                continue
+            page.append(drug)
+            if len(page) == limit:
+                break
+        return page
+
+    async def suggest(self, db: AsyncSession, prefix: str, limit: int) -> List[tuple]:
+        """Active drugs whose brand name, generic name or drug ID starts with prefix"""
+        await self.ensure_fresh(db)
+        return [(self._by_id[drug_pk], field) for drug_pk, field in self._suggest_index.lookup(prefix, limit)]
+
+    async def count(self, db: AsyncSession, active_only: bool) -> int:
+        await self.ensure_fresh(db)
+        if not active_only:
+            return len(self._by_id)
+        return sum(1 for drug in self._by_id.values() if drug.is_active)
+
+    async def summary(self, db: AsyncSession, low_stock_threshold: int, low_stock_limit: int) -> dict:
+        """
+        Stock totals per category of active drugs, plus active drugs with fewer
+        than low_stock_threshold units (fewest first). Reads the running totals,
+        so the cost grows with categories and low-stock items, not drugs.
+        """
+        await self.ensure_fresh(db)
+        categories = [
+            {"category": category, **totals, "stock_value": round(totals["stock_value"], 2)}
+            for category, totals in sorted(self._category_totals.items())
+        ]
+        end = bisect_left(self._stock_levels, (low_stock_threshold, -1))
+        return {
+            "categories": categories,
+            "drug_count": sum(category["drug_count"] for category in categories),
+            "units_in_stock": sum(category["units_in_stock"] for category in categories),
+            "stock_value": round(sum(totals["stock_value"] for totals in self._category_totals.values()), 2),
+            "low_stock_threshold": low_stock_threshold,
+            "low_stock_count": end,
+            "low_stock": [self._by_id[drug_pk] for _, drug_pk in self._stock_levels[:min(end, low_stock_limit)]],
+        }
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.version is not None,
+            "version": self.version,
+            "drugs": len(self._by_id),
+            "reloads": self.reloads,
+            "row_refreshes": self.row_refreshes,
+        }
+
+
+formulary_cache = FormularyCache()
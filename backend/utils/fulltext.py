@@ -0,0 +1,121 @@
+"""
+Full-text search indexes
+MySQL uses FULLTEXT indexes with the ngram parser; SQLite (test stand-in)
+uses FTS5 tables with the trigram tokenizer, kept in sync by triggers.
+Both match substrings of the indexed columns and rank by relevance.
+"""
+
+from sqlalchemy import column, literal_column, table, text
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.engine import Connection
+
+# Table -> columns covered by its full-text index
+FULLTEXT_INDEXES = {
+    "patients": ("full_name",),
+    "drugs": ("drug_id", "brand_name", "generic_name", "category"),
+}
+
+# Shortest query each backend can answer from the index (ngram_token_size=2,
+# FTS5 trigrams); shorter queries fall back to LIKE
+MIN_QUERY_LENGTH = {
+    "mysql": 2,
+    "sqlite": 3,
+}
+
+
+def fulltext_available(dialect_name: str, query: str) -> bool:
+    """Whether a query can be answered by the full-text index on this backend"""
+    min_length = MIN_QUERY_LENGTH.get(dialect_name)
+    return min_length is not None and len(query.strip()) >= min_length
+
+
+def apply_fulltext(stmt, model, query: str, dialect_name: str):
+    """
+    Restrict a select() of model to rows whose indexed columns contain query,
+    ordered by relevance (best first)
+    """
+    table_name = model.__tablename__
+    columns = FULLTEXT_INDEXES[table_name]
+    # fulltext_available measured the stripped query; match that same text
+    query = query.strip()
+
+    if dialect_name == "mysql":
+        # A quoted phrase matches consecutive ngrams, i.e. a substring
+        phrase = '"' + query.replace('"', " ") + '"'
+        relevance = match(*[getattr(model, name) for name in columns], against=phrase).in_boolean_mode()
+        return stmt.where(relevance > 0).order_by(relevance.desc())
+
+    fts = table(f"{table_name}_fts", column("rowid"), column("rank"))
+    phrase = '"' + query.replace('"', '""') + '"'
+    return (
+        stmt.join(fts, fts.c.rowid == model.id)
+        .where(literal_column(fts.name).op("MATCH")(phrase))
+        .order_by(fts.c.rank)
+    )
+
+
+def _mysql_index_exists(conn: Connection, table_name: str, index_name: str) -> bool:
+    result = conn.execute(
+        text(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = :table AND index_name = :index"
+        ),
+        {"table": table_name, "index": index_name},
+    )
+    return result.scalar() > 0
+
+
+def _sqlite_fts_statements(table_name: str, columns: tuple) -> list:
+    fts = f"{table_name}_fts"
+    cols = ", ".join(columns)
+    new_values = ", ".join(f"new.{name}" for name in columns)
+    old_values = ", ".join(f"old.{name}" for name in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table_name}', "
+        f"content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def ensure_fulltext_indexes(conn: Connection) -> list:
+    """
+    Create any missing full-text indexes (safe to run repeatedly; existing
+    rows are indexed when an index is created)
+
+    Args:
+        conn: Sync connection inside a transaction (engine.begin())
+
+    Returns:
+        list: Names of the indexes created
+    """
+    dialect_name = conn.dialect.name
+    created = []
+
+    for table_name, columns in FULLTEXT_INDEXES.items():
+        if dialect_name == "mysql":
+            index_name = f"ft_{table_name}"
+            if not _mysql_index_exists(conn, table_name, index_name):
+                conn.execute(text(
+                    f"CREATE FULLTEXT INDEX {index_name} ON {table_name} "
+                    f"({', '.join(columns)}) WITH PARSER ngram"
+                ))
+                created.append(index_name)
+
+        elif dialect_name == "sqlite":
+            index_name = f"{table_name}_fts"
+            exists = conn.execute(
+                text("SELECT COUNT(*) FROM sqlite_master WHERE name = :name"), {"name": index_name}
+            ).scalar()
+            if not exists:
+                for statement in _sqlite_fts_statements(table_name, columns):
+                    conn.execute(text(statement))
+                created.append(index_name)
+
+    return created
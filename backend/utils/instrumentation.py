@@ -0,0 +1,113 @@
+"""
+Per-request SQL instrumentation
+Counts statements and database time for each request, reports them in a
+Server-Timing header and writes statements over SLOW_QUERY_THRESHOLD_MS to
+the slow-query log
+"""
+
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config.settings import settings
+
+slow_query_logger = logging.getLogger("healthcare.slow_query")
+
+
+class RequestQueryStats:
+    """SQL statement count, database time and slow statements of one request"""
+
+    __slots__ = ("count", "db_time", "slow")
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.slow = []
+
+
+# Stats of the request being handled; None outside of a request
+current_query_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def log_slow_query(statement: str, duration: float, route: Optional[str], method: Optional[str]) -> None:
+    """Write one slow statement to the slow-query log as a JSON record"""
+    slow_query_logger.warning(json.dumps({
+        "event": "slow_query",
+        "route": route,
+        "method": method,
+        "duration_ms": round(duration * 1000, 3),
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "statement": " ".join(statement.split()),
+    }))
+
+
+# The start time lives on the statement's execution context rather than the
+# connection, so a statement that fails (no after_cursor_execute) leaves
+# nothing behind on a pooled connection
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_start_time", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    is_slow = duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS
+
+    stats = current_query_stats.get()
+    if stats is None:
+        # Outside a request (scripts, startup): log right away without a route
+        if is_slow:
+            log_slow_query(statement, duration, None, None)
+        return
+
+    stats.count += 1
+    stats.db_time += duration
+    if is_slow:
+        stats.slow.append((statement, duration))
+
+
+def install_query_hooks(engine: Engine) -> None:
+    """
+    Attach the timing hooks to an engine (pass async_engine.sync_engine for
+    the async engine)
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+async def sql_timing_middleware(request: Request, call_next):
+    """
+    HTTP middleware that collects RequestQueryStats for the request and adds
+    a Server-Timing header, e.g. `db;dur=3.2;desc="4 queries", app;dur=9.8`
+    """
+    stats = RequestQueryStats()
+    token = current_query_stats.set(stats)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        current_query_stats.reset(token)
+    total = time.perf_counter() - started
+
+    response.headers["Server-Timing"] = (
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.count} queries", '
+        f"app;dur={total * 1000:.1f}"
+    )
+
+    if stats.slow:
+        route = request.scope.get("route")
+        route_name = route.path if route is not None else request.url.path
+        for statement, duration in stats.slow:
+            log_slow_query(statement, duration, route_name, request.method)
+
+    return response
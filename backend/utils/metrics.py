@@ -0,0 +1,130 @@
+"""
+Prometheus-style request metrics
+Request counts, per-router latency histograms and in-flight requests, kept
+in plain per-process counters and rendered in the Prometheus text format
+"""
+
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+# Routers reported as their own label; everything else is "root" or "unmatched"
+ROUTER_LABELS = {"auth", "patients", "drugs", "search", "analytics"}
+
+# Latency histogram upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestMetrics:
+    """
+    Counters updated from the event loop only, so plain ints are enough and
+    no lock sits on the request path
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.requests = defaultdict(int)  # (router, method, status) -> count
+        self.latency_buckets = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))  # router -> per-bucket counts
+        self.latency_sum = defaultdict(float)  # router -> total seconds
+
+    def observe(self, router: str, method: str, status: int, duration: float) -> None:
+        self.requests[(router, method, status)] += 1
+        self.latency_buckets[router][bisect_left(LATENCY_BUCKETS, duration)] += 1
+        self.latency_sum[router] += duration
+
+
+request_metrics = RequestMetrics()
+
+
+def router_label(scope: dict) -> str:
+    """Map the matched route of a request to its router label"""
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    prefix = route.path.strip("/").split("/", 1)[0]
+    return prefix if prefix in ROUTER_LABELS else "root"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, latency and in-flight requests
+    into request_metrics
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        request_metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_metrics.in_flight -= 1
+            request_metrics.observe(
+                router_label(scope), scope["method"], status_code, time.perf_counter() - started
+            )
+
+
+def _format_labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def render_metrics(gauges: dict) -> str:
+    """
+    Render request_metrics plus extra gauges in the Prometheus text format
+
+    Args:
+        gauges: Mapping of metric name -> (help text, value) sampled at scrape time
+
+    Returns:
+        str: The exposition text
+    """
+    lines = [
+        "# HELP http_requests_total HTTP requests handled, by router, method and status",
+        "# TYPE http_requests_total counter",
+    ]
+    for (router, method, status), count in sorted(request_metrics.requests.items()):
+        lines.append(f"http_requests_total{_format_labels(router=router, method=method, status=status)} {count}")
+
+    lines += [
+        "# HELP http_request_duration_seconds HTTP request latency, by router",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for router in sorted(request_metrics.latency_buckets):
+        counts = request_metrics.latency_buckets[router]
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, counts):
+            cumulative += count
+            lines.append(f"http_request_duration_seconds_bucket{_format_labels(router=router, le=bound)} {cumulative}")
+        cumulative += counts[-1]
+        lines.append(f"http_request_duration_seconds_bucket{_format_labels(router=router, le='+Inf')} {cumulative}")
+        lines.append(f"http_request_duration_seconds_sum{_format_labels(router=router)} {request_metrics.latency_sum[router]:.6f}")
+        lines.append(f"http_request_duration_seconds_count{_format_labels(router=router)} {cumulative}")
+
+    lines += [
+        "# HELP http_requests_in_flight HTTP requests currently being handled",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {request_metrics.in_flight}",
+    ]
+
+    for name, (help_text, value) in gauges.items():
+        lines += [
+            f"# HELP {name} {help_text}",
+            f"# TYPE {name} gauge",
+            f"{name} {value}",
+        ]
+
+    return "\n".join(lines) + "\n"
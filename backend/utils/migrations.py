@@ -0,0 +1,85 @@
+"""
+Lightweight schema updates for existing databases
+create_all() only creates missing tables; these helpers add columns and
+indexes introduced after a table was first created
+"""
+
+from typing import List, Tuple
+
+from sqlalchemy import Date, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn
+
+from utils.dates import parse_expiry_date
+
+
+def add_missing_columns(conn: Connection, table) -> List[str]:
+    """
+    Add columns of a Table that the database table lacks, then create any of
+    the table's indexes that do not exist yet
+
+    Args:
+        conn: Sync connection inside a transaction (engine.begin())
+        table: SQLAlchemy Table (e.g. Patient.__table__)
+
+    Returns:
+        list: Names of the columns added
+    """
+    inspector = inspect(conn)
+    if not inspector.has_table(table.name):
+        return []
+
+    existing = {column["name"] for column in inspector.get_columns(table.name)}
+    added = []
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        column_ddl = CreateColumn(column).compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}"))
+        added.append(column.name)
+
+    existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name not in existing_indexes:
+            index.create(conn)
+
+    return added
+
+
+def convert_expiry_dates(conn: Connection) -> Tuple[int, List[str]]:
+    """
+    Turn the free-form drugs.expiry_date strings of older databases into dates
+
+    Values are rewritten in ISO form (what the Date type reads on SQLite),
+    then the MySQL column is changed to DATE. Unparseable values are cleared.
+    A no-op once the column is a DATE; SQLite cannot change the declared type,
+    so there it re-checks (already ISO values are left alone).
+
+    Returns:
+        tuple: (number of values converted, drug IDs whose value could not be parsed)
+    """
+    inspector = inspect(conn)
+    if not inspector.has_table("drugs"):
+        return 0, []
+    column = next(column for column in inspector.get_columns("drugs") if column["name"] == "expiry_date")
+    if isinstance(column["type"], Date):
+        return 0, []
+
+    rows = conn.execute(text("SELECT id, drug_id, expiry_date FROM drugs WHERE expiry_date IS NOT NULL")).all()
+    converted, unparsed = 0, []
+    for drug_pk, drug_code, raw in rows:
+        parsed = parse_expiry_date(raw)
+        if parsed is None:
+            unparsed.append(f"{drug_code} ({raw!r})")
+        elif parsed.isoformat() == raw:
+            continue
+        else:
+            converted += 1
+        conn.execute(
+            text("UPDATE drugs SET expiry_date = :value WHERE id = :id"),
+            {"value": parsed.isoformat() if parsed else None, "id": drug_pk},
+        )
+
+    if conn.dialect.name == "mysql":
+        conn.execute(text("ALTER TABLE drugs MODIFY COLUMN expiry_date DATE NULL"))
+    return converted, unparsed
@@ -0,0 +1,144 @@
+"""
+Name normalization and phonetic keys for fuzzy patient search
+Patient writes keep patient_name_keys in step through mapper events; fuzzy
+lookups find candidates through that index and rank them by trigram
+similarity of the normalized names
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Set
+
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.engine import Connection
+
+from models.patient import Patient
+from models.patient_name_key import PatientNameKey
+
+# Soundex digit for each consonant; vowels, h, w and y have none
+SOUNDEX_CODES = {
+    letter: digit
+    for digit, letters in {"1": "bfpv", "2": "cgjkqsxz", "3": "dt", "4": "l", "5": "mn", "6": "r"}.items()
+    for letter in letters
+}
+
+NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace ("José  dela-Cruz" -> "jose dela cruz")"""
+    folded = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    return " ".join(NON_ALPHANUMERIC.sub(" ", folded).split())
+
+
+def soundex(word: str) -> str:
+    """American Soundex code of one word ("Robert" -> R163); empty for words without letters"""
+    return _soundex(normalize_name(word))
+
+
+# Given names and surnames repeat across patients, so bulk imports mostly hit this
+@lru_cache(maxsize=4096)
+def _soundex(word: str) -> str:
+    # word is already normalized (lowercase ASCII)
+    letters = [char for char in word if char.isalpha()]
+    if not letters:
+        return ""
+
+    code = []
+    previous = SOUNDEX_CODES.get(letters[0], "")
+    for char in letters[1:]:
+        digit = SOUNDEX_CODES.get(char, "")
+        if digit and digit != previous:
+            code.append(digit)
+        if char not in "hw":
+            previous = digit
+    return (letters[0].upper() + "".join(code) + "000")[:4]
+
+
+def name_keys(name: str) -> List[str]:
+    """Distinct phonetic keys of the words of a name"""
+    keys = []
+    for word in normalize_name(name).split():
+        key = _soundex(word)
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {normalize_name(text)} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def trigram_similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the trigram sets of two names (0.0 - 1.0)"""
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+
+def name_key_rows(patient_id: int, full_name: str) -> List[dict]:
+    """patient_name_keys rows for one patient (for bulk inserts)"""
+    return [{"name_key": key, "patient_id": patient_id} for key in name_keys(full_name)]
+
+
+def candidate_ids_statement(query: str, limit: int):
+    """
+    IDs of patients sharing phonetic keys with query, most shared keys first
+    (an index range scan on patient_name_keys)
+    """
+    matched = PatientNameKey.patient_id
+    return (
+        select(matched)
+        .where(PatientNameKey.name_key.in_(name_keys(query)))
+        .group_by(matched)
+        .order_by(func.count().desc(), matched)
+        .limit(limit)
+    )
+
+
+def write_name_keys(conn: Connection, patient_id: int, full_name: str) -> None:
+    """Replace the phonetic keys of one patient"""
+    conn.execute(delete(PatientNameKey).where(PatientNameKey.patient_id == patient_id))
+    rows = name_key_rows(patient_id, full_name)
+    if rows:
+        conn.execute(insert(PatientNameKey), rows)
+
+
+@event.listens_for(Patient, "after_insert")
+def _insert_name_keys(mapper, connection, target):
+    rows = name_key_rows(target.id, target.full_name)
+    if rows:
+        connection.execute(insert(PatientNameKey), rows)
+
+
+@event.listens_for(Patient, "after_update")
+def _update_name_keys(mapper, connection, target):
+    if inspect(target).attrs.full_name.history.has_changes():
+        write_name_keys(connection, target.id, target.full_name)
+
+
+@event.listens_for(Patient, "after_delete")
+def _delete_name_keys(mapper, connection, target):
+    # ON DELETE CASCADE covers MySQL; SQLite does not enforce foreign keys by default
+    connection.execute(delete(PatientNameKey).where(PatientNameKey.patient_id == target.id))
+
+
+def backfill_name_keys(conn: Connection, batch_size: int = 1000) -> int:
+    """
+    Create phonetic keys for patients that have none (existing rows)
+
+    Returns:
+        int: Number of patients backfilled
+    """
+    has_keys = select(PatientNameKey.patient_id).where(PatientNameKey.patient_id == Patient.id).exists()
+    missing = conn.execute(select(Patient.id, Patient.full_name).where(~has_keys)).all()
+
+    for start in range(0, len(missing), batch_size):
+        rows = [row for patient_id, full_name in missing[start:start + batch_size]
+                for row in name_key_rows(patient_id, full_name)]
+        if rows:
+            conn.execute(insert(PatientNameKey), rows)
+    return len(missing)
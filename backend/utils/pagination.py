@@ -0,0 +1,74 @@
+"""
+Keyset (cursor) pagination helpers
+Cursors are opaque URL-safe strings wrapping the last id of the previous page
+(or, for relevance-ranked search results, the offset of the next page)
+"""
+
+import base64
+import json
+from typing import Optional
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+from utils.cache import TTLCache
+
+# Cached COUNT(*) results used for the approximate X-Total-Count header
+count_cache = TTLCache(max_size=64, ttl_seconds=settings.COUNT_CACHE_TTL_SECONDS)
+
+
+def encode_cursor(value: int, key: str = "id") -> str:
+    """Encode the last id of a page (or another position key) as an opaque cursor"""
+    raw = json.dumps({key: value}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, key: str = "id") -> int:
+    """
+    Decode a cursor produced by encode_cursor with the same key
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))[key]
+        if not isinstance(value, int) or value < 0:
+            raise ValueError(value)
+        return value
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def clamp_page_size(limit: int) -> int:
+    """Limit a requested page size to MAX_PAGE_SIZE"""
+    return min(limit, settings.MAX_PAGE_SIZE)
+
+
+def set_next_cursor(response: Response, rows: list, limit: int) -> Optional[str]:
+    """
+    Set the X-Next-Cursor header when the page is full (more rows may follow)
+    """
+    if not rows or len(rows) < limit:
+        return None
+    next_cursor = encode_cursor(rows[-1].id)
+    response.headers["X-Next-Cursor"] = next_cursor
+    return next_cursor
+
+
+async def approximate_count(db: AsyncSession, cache_key: str, query) -> int:
+    """
+    Count the rows matched by a select() statement, cached for
+    COUNT_CACHE_TTL_SECONDS so deep pagination does not re-count every page
+    """
+    total = count_cache.get(cache_key)
+    if total is None:
+        result = await db.execute(select(func.count()).select_from(query.order_by(None).subquery()))
+        total = result.scalar_one()
+        count_cache.set(cache_key, total)
+    return total
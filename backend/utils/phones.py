@@ -0,0 +1,112 @@
+"""
+Phone number normalization
+Patient writes store E.164 forms of phone_number and emergency_phone (plus the
+reversed digits of phone_number for suffix lookups) in indexed columns
+"""
+
+import re
+from typing import Optional
+
+from sqlalchemy import and_, event, select, update
+from sqlalchemy.engine import Connection
+
+from config.settings import settings
+from models.patient import Patient
+
+# Digit count from which a number without + or 00 is taken to already start
+# with its country code ("639171234567"); national numbers are shorter
+INTERNATIONAL_MIN_DIGITS = 11
+
+
+def normalize_phone(raw: Optional[str]) -> Optional[str]:
+    """
+    Convert a free-form phone number to E.164 ("0917 123 4567" -> "+639171234567")
+
+    Numbers starting with + or 00 keep their country code, as do numbers of
+    INTERNATIONAL_MIN_DIGITS or more that already start with
+    PHONE_DEFAULT_COUNTRY_CODE; numbers starting with a single 0, or other
+    numbers without a prefix, get PHONE_DEFAULT_COUNTRY_CODE.
+
+    Returns:
+        Optional[str]: The E.164 number, or None if it does not look like a phone number
+    """
+    if not raw:
+        return None
+
+    digits = re.sub(r"\D", "", raw)
+    if raw.strip().startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif digits.startswith("0"):
+        digits = settings.PHONE_DEFAULT_COUNTRY_CODE + digits[1:]
+    elif digits.startswith(settings.PHONE_DEFAULT_COUNTRY_CODE) and len(digits) >= INTERNATIONAL_MIN_DIGITS:
+        pass  # country code typed without the +
+    else:
+        digits = settings.PHONE_DEFAULT_COUNTRY_CODE + digits
+
+    if not 7 <= len(digits) <= 15:
+        return None
+    return "+" + digits
+
+
+def reversed_digits(e164: Optional[str]) -> Optional[str]:
+    """Digits of an E.164 number in reverse order, so a suffix becomes an indexable prefix"""
+    return e164[:0:-1] if e164 else None
+
+
+def phone_suffix_condition(digits: str):
+    """
+    Match patients whose phone number ends with digits, as a range on the
+    reversed-digits index (SQLite's case-insensitive LIKE cannot use the
+    index for a prefix match)
+    """
+    prefix = digits[::-1]
+    condition = Patient.phone_reversed >= prefix
+    # Upper bound: the prefix with its last non-9 digit incremented ("4599" -> "46")
+    head = prefix.rstrip("9")
+    if head:
+        condition = and_(condition, Patient.phone_reversed < head[:-1] + str(int(head[-1]) + 1))
+    return condition
+
+
+def apply_phone_columns(values: dict) -> dict:
+    """Fill the normalized phone columns of a patient row dict (for bulk inserts)"""
+    values["phone_e164"] = normalize_phone(values.get("phone_number"))
+    values["phone_reversed"] = reversed_digits(values["phone_e164"])
+    values["emergency_phone_e164"] = normalize_phone(values.get("emergency_phone"))
+    return values
+
+
+@event.listens_for(Patient, "before_insert")
+@event.listens_for(Patient, "before_update")
+def _set_phone_columns(mapper, connection, target):
+    target.phone_e164 = normalize_phone(target.phone_number)
+    target.phone_reversed = reversed_digits(target.phone_e164)
+    target.emergency_phone_e164 = normalize_phone(target.emergency_phone)
+
+
+def backfill_phone_columns(conn: Connection) -> int:
+    """
+    Populate normalized phone columns for rows written before they existed,
+    and recompute those that may hold a doubled default country code
+    ("+6363...", from numbers entered as "63..." without the +)
+
+    Returns:
+        int: Number of patients updated
+    """
+    doubled = "+" + settings.PHONE_DEFAULT_COUNTRY_CODE * 2 + "%"
+    rows = conn.execute(
+        select(Patient.id, Patient.phone_number, Patient.emergency_phone).where(
+            (Patient.phone_number.is_not(None) & Patient.phone_e164.is_(None))
+            | (Patient.emergency_phone.is_not(None) & Patient.emergency_phone_e164.is_(None))
+            | Patient.phone_e164.like(doubled)
+            | Patient.emergency_phone_e164.like(doubled)
+        )
+    ).all()
+
+    for patient_id, phone_number, emergency_phone in rows:
+        values = apply_phone_columns({"phone_number": phone_number, "emergency_phone": emergency_phone})
+        del values["phone_number"], values["emergency_phone"]
+        conn.execute(update(Patient).where(Patient.id == patient_id).values(**values))
+    return len(rows)
@@ -4,9 +4,20 @@ These schemas define the structure and validation rules for API data
 """
 
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import List, Optional, Union
 from datetime import date, datetime
 from models.user import UserRole
+from utils.dates import parse_expiry_date
+
+
+def parse_expiry_input(cls, v):
+    """Accept the free-form expiry formats older clients send, not just ISO dates"""
+    if isinstance(v, str) and v.strip():
+        parsed = parse_expiry_date(v)
+        if parsed is None:
+            raise ValueError('Unrecognized expiry date; use YYYY-MM-DD')
+        return parsed
+    return v or None
 
 
 # ===================================================================
@@ -17,6 +28,12 @@ class Token(BaseModel):
     """Schema for JWT token response"""
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    """Schema for exchanging a refresh token for a new token pair"""
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -106,9 +123,54 @@ class PatientCreate(PatientBase):
     pass
 
 
+class PatientUpdate(BaseModel):
+    """Schema for partially updating a patient (PATCH): only fields sent are changed"""
+    full_name: Optional[str] = Field(None, min_length=1, max_length=100)
+    age: Optional[int] = Field(None, gt=0, le=150)
+    gender: Optional[str] = Field(None, max_length=10)
+    date_of_birth: Optional[date] = None
+    phone_number: Optional[str] = Field(None, min_length=7, max_length=20)
+    address: Optional[str] = Field(None, max_length=255)
+    emergency_contact: Optional[str] = Field(None, max_length=100)
+    relationship: Optional[str] = Field(None, max_length=50)
+    emergency_phone: Optional[str] = Field(None, max_length=20)
+    height_cm: Optional[int] = Field(None, gt=0, le=300)
+    weight_kg: Optional[str] = None
+    blood_pressure: Optional[str] = Field(None, max_length=20)
+    temperature: Optional[str] = Field(None, max_length=10)
+    heart_rate: Optional[int] = Field(None, gt=0, le=300)
+    allergies: Optional[str] = Field(None, max_length=255)
+    symptoms: Optional[str] = Field(None, max_length=500)
+    diagnosis: Optional[str] = Field(None, max_length=500)
+    medical_history: Optional[str] = Field(None, max_length=1000)
+
+    @validator('full_name', 'age', 'gender', 'date_of_birth', 'phone_number')
+    def validate_required(cls, v):
+        """Fields required on the Add New Patient form may be changed but not cleared"""
+        if v is None:
+            raise ValueError('Field cannot be null')
+        return v
+
+    @validator('date_of_birth')
+    def validate_date_of_birth(cls, v):
+        """Ensure date of birth is not in the future"""
+        if v > date.today():
+            raise ValueError('Date of birth cannot be in the future')
+        return v
+
+    @validator('gender')
+    def validate_gender(cls, v):
+        """Validate gender field"""
+        allowed_genders = ['Male', 'Female', 'Other']
+        if v not in allowed_genders:
+            raise ValueError(f'Gender must be one of: {", ".join(allowed_genders)}')
+        return v
+
+
 class PatientOut(PatientBase):
     """Schema for patient data in responses"""
     id: int
+    version: int
     created_at: datetime
     updated_at: datetime
 
@@ -116,6 +178,33 @@ class PatientOut(PatientBase):
         from_attributes = True
 
 
+class PatientBatchRequest(BaseModel):
+    """Schema for fetching several patients by ID in one request"""
+    ids: List[int] = Field(..., min_length=1)
+
+
+class PatientBatchResponse(BaseModel):
+    """Schema for a batch patient lookup (results follow request order, None where missing)"""
+    results: List[Optional[PatientOut]]
+    missing: List[int]
+
+
+class ImportRowError(BaseModel):
+    """Schema for one rejected row of a bulk import"""
+    row: int
+    errors: List[str]
+
+
+class ImportSummary(BaseModel):
+    """Schema for the outcome of a bulk import"""
+    format: str
+    rows_received: int
+    inserted: int
+    failed: int
+    errors: List[ImportRowError]
+    errors_truncated: bool
+
+
 # ===================================================================
 # DRUG SCHEMAS
 # ===================================================================
@@ -130,7 +219,7 @@ class DrugBase(BaseModel):
     category: str = Field(..., max_length=100, description="Drug category (Analgesic, Antibiotic, etc.)")
     manufacturer: Optional[str] = Field(None, max_length=100, description="Manufacturer name")
     batch_number: Optional[str] = Field(None, max_length=50, description="Batch/Lot number")
-    expiry_date: Optional[str] = Field(None, max_length=20, description="Expiration date")
+    expiry_date: Optional[date] = Field(None, description="Expiration date (also accepts e.g. 12/31/2025 or 12/2025)")
     quantity_in_stock: int = Field(..., ge=0, description="Quantity in stock")
     unit_price: float = Field(..., gt=0, description="Cost per unit")
     description: Optional[str] = Field(None, description="Additional drug information")
@@ -147,6 +236,8 @@ class DrugBase(BaseModel):
             raise ValueError('Drug ID cannot be empty')
         return v.strip().upper()
 
+    _parse_expiry_date = validator('expiry_date', pre=True, allow_reuse=True)(parse_expiry_input)
+
 
 class DrugCreate(DrugBase):
     """Schema for creating a new drug"""
@@ -162,7 +253,7 @@ class DrugUpdate(BaseModel):
     category: Optional[str] = Field(None, max_length=100)
     manufacturer: Optional[str] = Field(None, max_length=100)
     batch_number: Optional[str] = Field(None, max_length=50)
-    expiry_date: Optional[str] = Field(None, max_length=20)
+    expiry_date: Optional[date] = None
     quantity_in_stock: Optional[int] = Field(None, ge=0)
     unit_price: Optional[float] = Field(None, gt=0)
     description: Optional[str] = None
@@ -172,10 +263,53 @@ class DrugUpdate(BaseModel):
     prescription_required: Optional[bool] = None
     is_active: Optional[bool] = None
 
+    _parse_expiry_date = validator('expiry_date', pre=True, allow_reuse=True)(parse_expiry_input)
+
+
+class StockAdjustment(BaseModel):
+    """Schema for a signed change to a drug's stock (negative when dispensing)"""
+    delta: int = Field(..., description="Units to add (positive) or remove (negative)")
+    reason: Optional[str] = Field(None, max_length=200, description="Dispensing, restock, count correction, etc.")
+
+    @validator('delta')
+    def validate_delta(cls, v):
+        """A zero adjustment is almost certainly a client bug"""
+        if v == 0:
+            raise ValueError('Delta cannot be zero')
+        return v
+
+
+class StockLevel(BaseModel):
+    """Schema for a drug's stock level after an adjustment"""
+    id: int
+    drug_id: str
+    quantity_in_stock: int
+
+
+class DrugUpsert(DrugUpdate):
+    """Schema for one row of a bulk formulary upsert (unset fields keep their current value)"""
+    drug_id: str = Field(..., min_length=1, max_length=20)
+
+    @validator('drug_id')
+    def validate_drug_id(cls, v):
+        """Match drug IDs the same way DrugCreate stores them"""
+        if not v.strip():
+            raise ValueError('Drug ID cannot be empty')
+        return v.strip().upper()
+
+
+class DrugUpsertSummary(BaseModel):
+    """Schema for the outcome of a bulk formulary upsert"""
+    inserted: List[str]
+    updated: List[str]
+    unchanged: int
+    dry_run: bool
+
 
 class DrugOut(DrugBase):
     """Schema for drug data in responses"""
     id: int
+    version: int
     is_active: int
     created_at: datetime
     updated_at: datetime
@@ -184,10 +318,57 @@ class DrugOut(DrugBase):
         from_attributes = True
 
 
+class DrugBatchRequest(BaseModel):
+    """Schema for fetching several drugs by database ID or by drug code in one request"""
+    ids: List[int] = Field(default_factory=list)
+    codes: List[str] = Field(default_factory=list)
+
+    @validator('codes')
+    def normalize_codes(cls, v):
+        """Drug codes are stored uppercase"""
+        return [code.strip().upper() for code in v]
+
+
+class DrugBatchResponse(BaseModel):
+    """Schema for a batch drug lookup (results follow request order, None where missing)"""
+    results: List[Optional[DrugOut]]
+    missing: List[Union[int, str]]
+
+
+class CategoryStockSummary(BaseModel):
+    """Schema for the stock totals of one drug category (active drugs)"""
+    category: str
+    drug_count: int
+    units_in_stock: int
+    stock_value: float
+
+
+class FormularySummary(BaseModel):
+    """Schema for the pharmacist dashboard: stock value per category and low-stock drugs"""
+    categories: List[CategoryStockSummary]
+    drug_count: int
+    units_in_stock: int
+    stock_value: float
+    low_stock_threshold: int
+    low_stock_count: int
+    low_stock: List[DrugOut]
+
+
 # ===================================================================
 # SEARCH SCHEMAS
 # ===================================================================
 
+class DrugSuggestion(BaseModel):
+    """Schema for a compact drug typeahead suggestion"""
+    id: int
+    drug_id: str
+    brand_name: str
+    generic_name: str
+    strength: str
+    dosage_form: str
+    matched_field: str
+
+
 class SearchResponse(BaseModel):
     """Schema for search results"""
     results: list
@@ -3,24 +3,56 @@ Security utilities for authentication and authorization
 Handles password hashing, JWT token creation and validation
 """
 
+import asyncio
+import hashlib
+import hmac
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient
 
 from config.settings import settings
 from config.database import get_db
+from models.cache_version import CacheVersion
 from models.user import User
+from utils.cache import TTLCache, read_cache_version
 
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+# Dedicated pool for bcrypt so password checks never run on the event loop
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+
+# Verifications running or waiting in password_executor (event-loop only)
+_password_jobs_in_flight = 0
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Resolved principals keyed by token subject (username), so authenticated
+# requests skip the users table lookup while the entry is fresh
+principal_cache = TTLCache(
+    max_size=settings.PRINCIPAL_CACHE_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+# cache_versions row bumped with every user write, so workers other than the
+# writer drop their cached principals within PRINCIPAL_VERSION_CHECK_SECONDS
+PRINCIPALS_CACHE_NAME = "principals"
+_principals_version: Optional[int] = None
+_principals_checked_at = 0.0
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -36,6 +68,46 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def password_queue_depth() -> int:
+    """Number of password verifications currently running or queued"""
+    return _password_jobs_in_flight
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password on the dedicated bcrypt worker pool
+    
+    Args:
+        plain_password: The plain text password
+        hashed_password: The hashed password from database
+        
+    Returns:
+        bool: True if password matches, False otherwise
+        
+    Raises:
+        HTTPException: 503 if the pool already holds PASSWORD_HASH_QUEUE_SIZE
+            waiting jobs on top of its busy workers
+    """
+    global _password_jobs_in_flight
+    
+    capacity = settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE
+    if _password_jobs_in_flight >= capacity:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Login service is busy. Please try again shortly.",
+            headers={"Retry-After": "1"},
+        )
+    
+    _password_jobs_in_flight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            password_executor, verify_password, plain_password, hashed_password
+        )
+    finally:
+        _password_jobs_in_flight -= 1
+
+
 def get_password_hash(password: str) -> str:
     """
     Hash a plain password
@@ -80,10 +152,37 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def create_refresh_token() -> str:
+    """
+    Create an opaque refresh token
+    
+    Returns:
+        str: A random URL-safe token; only its hash_refresh_token() digest is stored
+    """
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Hash a refresh token for storage and lookup
+    
+    Args:
+        token: The refresh token presented by the client
+        
+    Returns:
+        str: HMAC-SHA256 hex digest keyed with SECRET_KEY
+    """
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), token.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
     """
     Get the current authenticated user from the JWT token
     
+    The user row is served from principal_cache when present; a miss loads
+    it from the database and caches it detached from the session, so a later
+    rollback of that request cannot expire the shared cached copy.
+    
     Args:
         token: The JWT token from the request
         db: Database session
@@ -108,14 +207,73 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    await sync_principal_cache(db)
+    user = principal_cache.get(username)
+    if user is not None:
+        return user
+    
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalars().first()
     if user is None:
         raise credentials_exception
     
+    db.expunge(user)
+    make_transient(user)
+    principal_cache.set(username, user)
     return user
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def sync_principal_cache(db: AsyncSession) -> None:
+    """
+    Clear principal_cache if the shared "principals" version moved since the
+    last check, i.e. a user was changed by another worker or process.
+    Checks at most every PRINCIPAL_VERSION_CHECK_SECONDS.
+    """
+    global _principals_version, _principals_checked_at
+    
+    if not principal_cache.enabled:
+        return
+    now = time.monotonic()
+    if now - _principals_checked_at < settings.PRINCIPAL_VERSION_CHECK_SECONDS:
+        return
+    _principals_checked_at = now
+    
+    current = await read_cache_version(db, PRINCIPALS_CACHE_NAME)
+    if current != _principals_version:
+        principal_cache.clear()
+        _principals_version = current
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_cached_principal(mapper, connection, target):
+    """
+    Drop a user from principal_cache whenever the row is updated or deleted
+    (role or is_active changes, renames, password resets), and bump the
+    "principals" cache version in the same transaction so other workers
+    clear theirs.
+    
+    Only ORM unit-of-work flushes fire this hook; bulk UPDATE statements and
+    writes from outside the application must bump the "principals" row in
+    cache_versions themselves, or they show up only after
+    PRINCIPAL_CACHE_TTL_SECONDS.
+    """
+    bumped = connection.execute(
+        update(CacheVersion)
+        .where(CacheVersion.name == PRINCIPALS_CACHE_NAME)
+        .values(version=CacheVersion.version + 1)
+    )
+    if bumped.rowcount == 0:
+        connection.execute(insert(CacheVersion).values(name=PRINCIPALS_CACHE_NAME, version=1))
+    
+    principal_cache.invalidate(target.username)
+    
+    # A rename leaves the old username in the cache as well
+    for old_username in inspect(target).attrs.username.history.deleted:
+        principal_cache.invalidate(old_username)
+
+
+async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """
     Get the current active user (ensures user account is active)
     
@@ -144,7 +302,7 @@ def require_role(allowed_roles: list):
     Returns:
         A dependency function that checks user role
     """
-    def role_checker(current_user: User = Depends(get_current_active_user)):
+    async def role_checker(current_user: User = Depends(get_current_active_user)):
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,82 @@
+"""
+Prefix index for drug typeahead suggestions
+A sorted array of lowercase keys searched with bisect; every word start of
+brand_name and generic_name is indexed, plus drug_id
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, List, Tuple
+
+# Drug fields offered as suggestions
+SUGGEST_FIELDS = ("brand_name", "generic_name", "drug_id")
+
+
+def suggestion_keys(value: str) -> List[str]:
+    """
+    Lowercase keys for one field value: the full value and the remainder from
+    each later word start, so "Cetirizine Hydrochloride" matches "hydro"
+    """
+    words = value.lower().split()
+    return [" ".join(words[index:]) for index in range(len(words))]
+
+
+class DrugSuggestIndex:
+    """
+    Sorted (key, field, drug id) entries over active drugs.
+    Lookups are a bisect plus a scan of the matching run; updates touch
+    only the entries of the drug that changed.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[str, str, int]] = []
+        self._entries_by_drug: Dict[int, List[Tuple[str, str, int]]] = {}
+
+    def _entries_for(self, drug) -> List[Tuple[str, str, int]]:
+        entries = []
+        for field in SUGGEST_FIELDS:
+            value = getattr(drug, field)
+            if value:
+                entries.extend((key, field, drug.id) for key in suggestion_keys(value))
+        return entries
+
+    def rebuild(self, drugs) -> None:
+        """Index all active drugs from scratch"""
+        self._entries_by_drug = {drug.id: self._entries_for(drug) for drug in drugs if drug.is_active}
+        self._entries = sorted(entry for entries in self._entries_by_drug.values() for entry in entries)
+
+    def remove(self, drug_pk: int) -> None:
+        for entry in self._entries_by_drug.pop(drug_pk, []):
+            index = bisect_left(self._entries, entry)
+            if index < len(self._entries) and self._entries[index] == entry:
+                del self._entries[index]
+
+    def add(self, drug) -> None:
+        """Index one drug (archived drugs are skipped)"""
+        if not drug.is_active:
+            return
+        entries = self._entries_for(drug)
+        self._entries_by_drug[drug.id] = entries
+        for entry in entries:
+            insort(self._entries, entry)
+
+    def lookup(self, prefix: str, limit: int) -> List[Tuple[int, str]]:
+        """
+        Return up to limit (drug id, matched field) pairs whose key starts with
+        prefix, in alphabetical order of the matched key, one per drug
+        """
+        prefix = " ".join(prefix.lower().split())
+        if not prefix:
+            return []
+
+        matches = []
+        seen = set()
+        index = bisect_left(self._entries, (prefix,))
+        while index < len(self._entries) and len(matches) < limit:
+            key, field, drug_pk = self._entries[index]
+            if not key.startswith(prefix):
+                break
+            if drug_pk not in seen:
+                seen.add(drug_pk)
+                matches.append((drug_pk, field))
+            index += 1
+        return matches
@@ -0,0 +1,102 @@
+"""
+Numeric vitals
+Patient writes parse the free-text blood pressure, temperature and weight
+fields into numeric shadow columns (systolic, diastolic, temp_c,
+weight_kg_num) that analytics can load without parsing text
+"""
+
+import re
+from typing import Optional, Tuple
+
+from sqlalchemy import event, select, update
+from sqlalchemy.engine import Connection
+
+from models.patient import Patient
+
+NUMBER = r"(\d+(?:\.\d+)?)"
+BLOOD_PRESSURE_PATTERN = re.compile(r"(\d{2,3})\s*/\s*(\d{2,3})")
+TEMPERATURE_PATTERN = re.compile(NUMBER + r"\s*°?\s*([CF])?", re.IGNORECASE)
+WEIGHT_PATTERN = re.compile(NUMBER + r"\s*(kg|kgs|lb|lbs)?", re.IGNORECASE)
+
+POUND_IN_KG = 0.45359237
+
+
+def parse_blood_pressure(raw: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """("120/80 mmHg") -> (120, 80); (None, None) if missing or implausible"""
+    match = BLOOD_PRESSURE_PATTERN.search(raw or "")
+    if not match:
+        return None, None
+    systolic, diastolic = int(match.group(1)), int(match.group(2))
+    if not (50 <= systolic <= 300 and 20 <= diastolic <= 200 and diastolic < systolic):
+        return None, None
+    return systolic, diastolic
+
+
+def parse_temperature(raw: Optional[str]) -> Optional[float]:
+    """Body temperature in °C ("37.2°C", "99.1 F", "37.2"); Fahrenheit is converted"""
+    match = TEMPERATURE_PATTERN.search((raw or "").replace(",", "."))  # decimal commas
+    if not match:
+        return None
+    value = float(match.group(1))
+    unit = (match.group(2) or "").upper()
+    if unit == "F" or (not unit and value > 50):
+        value = (value - 32) * 5 / 9
+    return round(value, 1) if 25 <= value <= 45 else None
+
+
+def parse_weight(raw: Optional[str]) -> Optional[float]:
+    """Weight in kg ("55.5", "55.5 kg", "121 lbs"); pounds are converted"""
+    match = WEIGHT_PATTERN.search((raw or "").replace(",", "."))
+    if not match:
+        return None
+    value = float(match.group(1))
+    if (match.group(2) or "").lower().startswith("lb"):
+        value *= POUND_IN_KG
+    return round(value, 2) if 0.5 <= value <= 500 else None
+
+
+def vital_columns(blood_pressure: Optional[str], temperature: Optional[str], weight_kg: Optional[str]) -> dict:
+    """Shadow column values for one patient's vitals"""
+    systolic, diastolic = parse_blood_pressure(blood_pressure)
+    return {
+        "systolic": systolic,
+        "diastolic": diastolic,
+        "temp_c": parse_temperature(temperature),
+        "weight_kg_num": parse_weight(weight_kg),
+    }
+
+
+def apply_vital_columns(values: dict) -> dict:
+    """Fill the numeric vitals columns of a patient row dict (for bulk inserts)"""
+    values.update(vital_columns(values.get("blood_pressure"), values.get("temperature"), values.get("weight_kg")))
+    return values
+
+
+@event.listens_for(Patient, "before_insert")
+@event.listens_for(Patient, "before_update")
+def _set_vital_columns(mapper, connection, target):
+    for column, value in vital_columns(target.blood_pressure, target.temperature, target.weight_kg).items():
+        setattr(target, column, value)
+
+
+def backfill_vital_columns(conn: Connection) -> int:
+    """
+    Populate numeric vitals for rows written before the columns existed
+
+    Returns:
+        int: Number of patients updated
+    """
+    rows = conn.execute(
+        select(Patient.id, Patient.blood_pressure, Patient.temperature, Patient.weight_kg).where(
+            (Patient.blood_pressure.is_not(None) & Patient.systolic.is_(None))
+            | (Patient.temperature.is_not(None) & Patient.temp_c.is_(None))
+            | (Patient.weight_kg.is_not(None) & Patient.weight_kg_num.is_(None))
+        )
+    ).all()
+
+    for patient_id, blood_pressure, temperature, weight_kg in rows:
+        conn.execute(
+            update(Patient).where(Patient.id == patient_id)
+            .values(**vital_columns(blood_pressure, temperature, weight_kg))
+        )
+    return len(rows)